@@ -0,0 +1,158 @@
+"""ArcGIS REST extraction backend.
+
+Reads the same six inventory columns the Preview panel shows straight from
+the portal's ``sharing/rest/search`` endpoint, using the token of an already
+authenticated Selenium session.
+"""
+import json
+import logging
+from datetime import datetime, timezone
+from urllib.parse import unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100  # maximum ``num`` accepted by sharing/rest/search
+
+# Labels the Preview panel's share summary uses for each ``access`` value
+ACCESS_LABELS = {
+    'public': 'Public',
+    'org': 'Organization',
+    'shared': 'Groups',
+    'private': 'Owner',
+}
+
+
+def token_from_driver(driver, portal_url: str, session=None):
+    """Return a portal token for the user logged in to ``driver``.
+
+    The token is read from the ``esri_auth`` cookie when the portal sets one,
+    otherwise it is exchanged for the browser's cookies via platformSelf.
+    """
+    cookies = {c['name']: c['value'] for c in driver.get_cookies()}
+    if 'esri_auth' in cookies:
+        try:
+            token = json.loads(unquote(cookies['esri_auth'])).get('token')
+            if token:
+                return token
+        except ValueError:
+            logger.warning("Could not parse esri_auth cookie")
+
+    session = session or requests.Session()
+    response = session.post(
+        f"{portal_url}/sharing/rest/oauth2/platformSelf",
+        params={'f': 'json'},
+        headers={'X-Esri-Auth-Client-Id': 'arcgisonline', 'Referer': portal_url},
+        cookies=cookies,
+        timeout=30,
+    )
+    response.raise_for_status()
+    token = response.json().get('token')
+    if not token:
+        raise RuntimeError("Portal did not return a token for the browser session")
+    return token
+
+
+def format_modified(epoch_ms, tz=None):
+    """Format an item's ``modified`` epoch milliseconds like the Preview panel.
+
+    The item browser shows dates in the browser's time zone, which is this
+    machine's local time zone unless ``tz`` (a tzinfo) says otherwise.
+    """
+    if epoch_ms is None:
+        return None
+    dt = datetime.fromtimestamp(epoch_ms / 1000, tz=timezone.utc).astimezone(tz)
+    return f"{dt:%b} {dt.day}, {dt.year}"
+
+
+def item_to_row(item):
+    """Convert a search result to the six-column inventory row."""
+    access = item.get('access')
+    return [
+        item.get('title'),
+        item.get('id'),
+        item.get('type'),
+        item.get('owner'),
+        ACCESS_LABELS.get(access, access),
+        format_modified(item.get('modified')),
+    ]
+
+
+class ArcGISRestClient:
+    """Pooled HTTP client for the portal's sharing REST API."""
+
+    def __init__(self, portal_url: str, token: str, pool_size: int = 10, timeout: float = 30):
+        self.portal_url = portal_url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def get(self, path: str, **params):
+        """GET a sharing REST resource and return its JSON body."""
+        params.update(f='json', token=self.token)
+        response = self.session.get(
+            f"{self.portal_url}/sharing/rest/{path}", params=params, timeout=self.timeout
+        )
+        response.raise_for_status()
+        data = response.json()
+        # The REST API reports errors with HTTP 200 and an "error" body
+        if 'error' in data:
+            error = data['error']
+            raise RuntimeError(f"ArcGIS REST error {error.get('code')}: {error.get('message')}")
+        return data
+
+    def org_id(self):
+        return self.get('portals/self')['id']
+
+    def iter_items(self, query=None, sort_field: str = 'modified', sort_order: str = 'desc'):
+        """Yield every item matching ``query`` (default: the whole org), page by page."""
+        if query is None:
+            query = f"orgid:{self.org_id()}"
+        start = 1
+        total = yielded = 0
+        while start != -1:
+            page = self.get(
+                'search', q=query, start=start, num=PAGE_SIZE,
+                sortField=sort_field, sortOrder=sort_order,
+            )
+            if start == 1:
+                total = page.get('total') or 0
+                logger.info(f"REST search found {total} items")
+            results = page.get('results', [])
+            yielded += len(results)
+            yield from results
+            start = page.get('nextStart', -1)
+        if yielded < total:
+            # The search endpoint stops paging after 10,000 results
+            logger.warning(
+                f"REST search returned only {yielded} of {total} items; "
+                f"narrow the query to reach the rest"
+            )
+
+    def iter_rows(self, query=None):
+        """Yield six-column inventory rows for every matching item."""
+        for item in self.iter_items(query):
+            yield item_to_row(item)
+
+
+def token_is_valid(portal_url: str, token: str):
+    """Cheaply check that ``token`` is still accepted by the portal."""
+    client = ArcGISRestClient(portal_url, token, pool_size=1)
+    try:
+        client.get('community/self')
+        return True
+    except (requests.RequestException, RuntimeError) as e:
+        logger.info(f"Token check failed: {e}")
+        return False
+    finally:
+        client.close()
@@ -0,0 +1,314 @@
+"""Offline benchmark for the scraper.
+
+Runs the real scraping loop against fixtures/item_browser.html, a local page
+reproducing the ArcGIS item browser's web components and shadow roots, or
+against FakeDriver, an in-process driver with the same behaviour for
+machines without Chrome. Reports rows per second and the latency of each
+phase: Preview clicks, row extraction and sheet writes.
+
+    python benchmark.py --driver fake --items 120 --preview-latency 50
+    python benchmark.py --driver chrome --items 600 --page-size 60
+"""
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from selenium.common.exceptions import JavascriptException, NoSuchElementException
+
+from passts import AGOLScraper, GO_TO_PAGE_SCRIPT, HEAP_SCRIPT, JUMP_TO_PAGE_SCRIPT
+from waits import PAGE_STATE_SCRIPT, TABLE_ROWS_SCRIPT
+from page_helper import CALL_SCRIPT, HELPER_JS, inject_helper
+from network_capture import NetworkCapture
+from sinks import InMemoryWorksheet
+from browser_profile import LEAN_PROFILE
+
+FIXTURE_PAGE = Path(__file__).parent / 'fixtures' / 'item_browser.html'
+
+TYPES = ['Web Map', 'Feature Layer', 'Dashboard', 'Web Mapping Application', 'Survey123 Form']
+# (share summary text, label read from the table's sharing icon), as in the fixture page
+SHARING = [
+    ('Everyone (public)', 'Public'),
+    ('Organization', 'Organization'),
+    ('Groups', 'Groups'),
+    ('Owner', 'Owner'),
+]
+
+
+# REST ``access`` values for each entry of SHARING
+ACCESS = ['public', 'org', 'shared', 'private']
+
+
+def search_result(n):
+    """Item n as a sharing/rest/search result, as the item browser fetches it."""
+    # Local midnight, so the REST date formats to the same day the fixture page shows
+    modified = datetime(2024, 12, 31) - timedelta(days=n)
+    item = fixture_item(n)
+    return {
+        'id': item['id'], 'title': item['title'], 'type': item['type'], 'owner': item['owner'],
+        'access': ACCESS[n % len(ACCESS)], 'modified': int(modified.timestamp() * 1000),
+    }
+
+
+def fixture_item(n):
+    """Item n of the fixture org; matches item() in fixtures/item_browser.html."""
+    modified = datetime(2024, 12, 31) - timedelta(days=n)
+    return {
+        'id': f"{n:032x}",
+        'title': f"Fixture item {n}",
+        'type': TYPES[n % len(TYPES)],
+        'owner': f"owner{n % 7}",
+        'sharing': SHARING[n % len(SHARING)],
+        'modified': f"{modified:%b} {modified.day}, {modified.year}",
+    }
+
+
+class FakeDriver:
+    """In-process stand-in for a webdriver showing the fixture org.
+
+    Recognises the scraper's scripts and page helper calls and answers them
+    from the fixture items, with the same render delays as the fixture page:
+    the Preview panel switches ``preview_latency`` seconds after a click and
+    rows render ``page_latency`` seconds after a page change. Every call also
+    costs ``script_latency`` seconds to stand in for the WebDriver round trip.
+    Each page change also logs the DevTools events of the search request
+    that fills the page, for network capture.
+    """
+
+    def __init__(self, items: int = 120, page_size: int = 60, preview_latency: float = 0.05,
+                 page_latency: float = 0.2, script_latency: float = 0.002):
+        self.items = items
+        self.page_size = page_size
+        self.preview_latency = preview_latency
+        self.page_latency = page_latency
+        self.script_latency = script_latency
+        self.start_item = 1
+        self.rows_ready_at = time.monotonic() + page_latency
+        self.preview = None
+        self.pending_preview = None
+        self.performance_log = []
+        self.response_bodies = {}
+        self._log_search()
+
+    def _log_search(self):
+        request_id = str(len(self.response_bodies) + 1)
+        start = self.start_item - 1
+        end = min(start + self.page_size, self.items)
+        self.response_bodies[request_id] = json.dumps({
+            'total': self.items, 'start': start + 1, 'num': self.page_size,
+            'nextStart': end + 1 if end < self.items else -1,
+            'results': [search_result(n) for n in range(start, end)],
+        })
+        url = f"https://example.invalid/sharing/rest/search?start={start + 1}&num={self.page_size}"
+        for method, params in (
+            ('Network.responseReceived', {'response': {'url': url, 'mimeType': 'application/json'}}),
+            ('Network.loadingFinished', {}),
+        ):
+            message = {'method': method, 'params': {'requestId': request_id, **params}}
+            self.performance_log.append({'message': json.dumps({'message': message})})
+
+    def get_log(self, log_type):
+        entries, self.performance_log = self.performance_log, []
+        return entries
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Network.getResponseBody':
+            return {'body': self.response_bodies[params['requestId']], 'base64Encoded': False}
+        return {}
+
+    def _page_rows(self):
+        if time.monotonic() < self.rows_ready_at:
+            return []
+        start = self.start_item - 1
+        return list(range(start, min(start + self.page_size, self.items)))
+
+    def _preview_item(self):
+        if self.pending_preview and time.monotonic() >= self.pending_preview[1]:
+            self.preview = self.pending_preview[0]
+            self.pending_preview = None
+        return self.preview
+
+    def _go_to(self, page):
+        pages = -(-self.items // self.page_size)
+        page = max(1, min(page, pages))
+        self.start_item = (page - 1) * self.page_size + 1
+        self.rows_ready_at = time.monotonic() + self.page_latency
+        self._log_search()
+        return f"Clicked page {page}"
+
+    def execute_script(self, script, *args):
+        time.sleep(self.script_latency)
+        if script == CALL_SCRIPT:
+            return getattr(self, f"_helper_{args[0]}")(*args[1:])
+        if script == HELPER_JS:
+            return None
+        if script == TABLE_ROWS_SCRIPT:
+            return len(self._page_rows())
+        if script == PAGE_STATE_SCRIPT:
+            rows = self._page_rows()
+            return {
+                'total': self.items, 'pageSize': self.page_size, 'startItem': self.start_item,
+                'rows': len(rows), 'rendered': len(rows),
+                'firstRow': fixture_item(rows[0])['title'] if rows else None,
+            }
+        if script == GO_TO_PAGE_SCRIPT:
+            return self._go_to(args[0])
+        if script == JUMP_TO_PAGE_SCRIPT:
+            start_item, announce = args
+            if announce:
+                self._go_to((start_item - 1) // self.page_size + 1)
+            else:
+                self.start_item = start_item
+            return True
+        if script == HEAP_SCRIPT:
+            return None
+        raise JavascriptException("FakeDriver does not recognise this script")
+
+    def _helper_preview(self):
+        n = self._preview_item()
+        if n is None:
+            return dict.fromkeys(('title', 'ID', 'type', 'last_updated', 'Owner', 'Sharing'))
+        it = fixture_item(n)
+        sharing = it['sharing'][0]
+        return {
+            'title': it['title'], 'ID': it['id'], 'type': it['type'],
+            'last_updated': it['modified'], 'Owner': it['owner'],
+            'Sharing': 'Public' if sharing == 'Everyone (public)' else sharing,
+        }
+
+    def _helper_tableRows(self):
+        return [
+            {
+                'title': it['title'], 'ID': it['id'], 'type': it['type'],
+                'last_updated': it['modified'], 'Owner': it['owner'],
+                'Sharing': it['sharing'][1],
+            }
+            for it in map(fixture_item, self._page_rows())
+        ]
+
+    def _helper_clickPreview(self, index):
+        rows = self._page_rows()
+        if index >= len(rows):
+            return "No Preview button found in any row"
+        self.pending_preview = (rows[index], time.monotonic() + self.preview_latency)
+        return "Found and clicked Preview button"
+
+    def find_element(self, by, value):
+        if not self._page_rows():
+            raise NoSuchElementException(value)
+        return object()
+
+    def get_cookies(self):
+        return []
+
+    def save_screenshot(self, filename):
+        return True
+
+    def quit(self):
+        pass
+
+
+class SlowWorksheet(InMemoryWorksheet):
+    """InMemoryWorksheet whose API calls take ``latency`` seconds, like the Sheets API."""
+
+    def __init__(self, latency: float = 0.3):
+        super().__init__()
+        self.latency = latency
+
+    def append_rows(self, values, value_input_option: str = "RAW"):
+        time.sleep(self.latency)
+        super().append_rows(values, value_input_option)
+
+    def batch_update(self, data, value_input_option: str = "RAW"):
+        time.sleep(self.latency)
+        super().batch_update(data, value_input_option)
+
+
+def run_benchmark(driver, sheet, batch_size: int = 100, table_extraction: bool = False,
+                  pages=None, write_queue_size: int = 500, network: bool = False):
+    """Scrape every fixture page with a real AGOLScraper and return (rows, seconds, metrics).
+
+    With ``network`` rows come from the captured search responses instead of the page.
+    """
+    scraper = AGOLScraper(
+        credentials_path=None, sheet_name=None, sheet=sheet, batch_size=batch_size,
+        session_path=None, state_path=None, checkpoint_path=None,
+        table_extraction=table_extraction, report_path=None,
+        write_queue_size=write_queue_size, index_path=None,
+    )
+    scraper.driver = driver
+
+    start = time.perf_counter()
+    if network:
+        scraper.capture = NetworkCapture(driver)
+        scraper._scrape_network_capture(1, pages)
+    else:
+        for page, row_count in scraper._iter_pages(1, pages):
+            scraper._save_rows(scraper._iter_page_rows(row_count))
+    scraper.writer.flush()
+    elapsed = time.perf_counter() - start
+    return len(sheet.rows), elapsed, scraper.metrics
+
+
+def print_report(rows, elapsed, metrics, sheet):
+    print(f"{rows} rows in {elapsed:.2f} s: {rows / elapsed:.1f} rows/s, {sheet.calls} sheet calls")
+    print(f"{'phase':<20} {'count':>6} {'mean ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for name, stats in metrics.summary()['phases'].items():
+        print(
+            f"{name:<20} {stats['count']:>6} {stats['total'] / stats['count'] * 1000:>9.1f} "
+            f"{stats['p50'] * 1000:>8.1f} {stats['p95'] * 1000:>8.1f} {stats['max'] * 1000:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--driver', choices=('fake', 'chrome'), default='fake')
+    parser.add_argument('--items', type=int, default=120)
+    parser.add_argument('--page-size', type=int, default=60)
+    parser.add_argument('--pages', type=int, help="stop after this many pages")
+    parser.add_argument('--preview-latency', type=float, default=50, help="ms")
+    parser.add_argument('--page-latency', type=float, default=200, help="ms")
+    parser.add_argument('--sheet-latency', type=float, default=300, help="ms per Sheets call")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--table-extraction', action='store_true')
+    parser.add_argument('--network', action='store_true',
+                        help="read rows from captured search responses (fake driver only)")
+    parser.add_argument('--sync-writes', action='store_true',
+                        help="write to the sheet on the scraping thread")
+    parser.add_argument('--headed', action='store_true', help="show Chrome")
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    if args.network and args.driver != 'fake':
+        parser.error("--network needs --driver fake; the fixture page makes no API requests")
+    if args.driver == 'fake':
+        driver = FakeDriver(
+            args.items, args.page_size, args.preview_latency / 1000, args.page_latency / 1000
+        )
+    else:
+        driver = LEAN_PROFILE.replace(headless=not args.headed).create()
+        inject_helper(driver)
+        driver.get(FIXTURE_PAGE.as_uri() + '?' + urlencode({
+            'items': args.items, 'pageSize': args.page_size,
+            'previewLatency': args.preview_latency, 'pageLatency': args.page_latency,
+        }))
+
+    sheet = SlowWorksheet(args.sheet_latency / 1000)
+    try:
+        rows, elapsed, metrics = run_benchmark(
+            driver, sheet, args.batch_size, args.table_extraction, args.pages,
+            0 if args.sync_writes else 500, args.network,
+        )
+    finally:
+        driver.quit()
+    print_report(rows, elapsed, metrics, sheet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Chrome profiles for the scraper, and a timing report to compare them.
+
+Run ``python browser_profile.py [url ...]`` to compare driver startup and
+page load times of the original profile against the lean one.
+"""
+import sys
+import copy
+import time
+import logging
+
+from selenium import webdriver
+
+logger = logging.getLogger(__name__)
+
+# Resources the scraper never reads: images, thumbnails, fonts, media and map tiles
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3',
+    '*/info/thumbnail/*', '*/tile/*', '*/tiles/*',
+]
+
+PAGE_WEIGHT_SCRIPT = """
+    const nav = performance.getEntriesByType('navigation')[0];
+    let bytes = nav ? nav.transferSize : 0;
+    for (const entry of performance.getEntriesByType('resource')) {
+        bytes += entry.transferSize || 0;
+    }
+    return bytes;
+"""
+
+
+class DriverProfile:
+    """Settings used to start a Chrome webdriver.
+
+    ``page_load_strategy`` 'eager' returns from get() at DOMContentLoaded
+    instead of waiting for every subresource. ``block_resources`` blocks
+    BLOCKED_URL_PATTERNS through the DevTools Network domain, and
+    ``user_data_dir`` reuses a Chrome profile directory (cache and cookies)
+    across runs; only one browser can use a given directory at a time.
+    ``capture_network`` records DevTools Network events in the performance
+    log for network_capture.NetworkCapture.
+    """
+
+    def __init__(self, headless: bool = False, page_load_strategy: str = 'normal',
+                 block_resources: bool = False, user_data_dir=None,
+                 window_size=(1920, 1080), capture_network: bool = False):
+        self.headless = headless
+        self.page_load_strategy = page_load_strategy
+        self.block_resources = block_resources
+        self.user_data_dir = user_data_dir
+        self.window_size = window_size
+        self.capture_network = capture_network
+
+    def replace(self, **changes):
+        """Return a copy of this profile with some settings changed."""
+        profile = copy.copy(self)
+        for name, value in changes.items():
+            setattr(profile, name, value)
+        return profile
+
+    def options(self):
+        options = webdriver.ChromeOptions()
+        options.page_load_strategy = self.page_load_strategy
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument(f"--window-size={self.window_size[0]},{self.window_size[1]}")
+        else:
+            options.add_argument("--start-maximized")
+        if self.user_data_dir:
+            options.add_argument(f"--user-data-dir={self.user_data_dir}")
+        if self.block_resources:
+            options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+            options.add_argument("--disable-extensions")
+            options.add_argument("--mute-audio")
+        if self.capture_network:
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        return options
+
+    def create(self):
+        """Start a Chrome webdriver with this profile."""
+        driver = webdriver.Chrome(options=self.options())
+        if self.block_resources or self.capture_network:
+            driver.execute_cdp_cmd("Network.enable", {})
+        if self.block_resources:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        return driver
+
+
+# The profile the scraper has always used: headed, maximized, loads everything
+DEFAULT_PROFILE = DriverProfile()
+LEAN_PROFILE = DriverProfile(headless=True, page_load_strategy='eager', block_resources=True)
+
+
+def time_profile(profile, urls):
+    """Return startup seconds and (url, load seconds, bytes) for each url."""
+    start = time.perf_counter()
+    driver = profile.create()
+    startup = time.perf_counter() - start
+    loads = []
+    try:
+        for url in urls:
+            start = time.perf_counter()
+            driver.get(url)
+            elapsed = time.perf_counter() - start
+            loads.append((url, elapsed, driver.execute_script(PAGE_WEIGHT_SCRIPT)))
+    finally:
+        driver.quit()
+    return startup, loads
+
+
+def timing_report(urls, profiles=None):
+    """Print startup and per-page load times for each profile."""
+    profiles = profiles or {'default': DEFAULT_PROFILE, 'lean': LEAN_PROFILE}
+    print(f"{'profile':<10} {'startup s':>10} {'avg load s':>11} {'avg KB':>9}")
+    for name, profile in profiles.items():
+        startup, loads = time_profile(profile, urls)
+        avg_load = sum(load[1] for load in loads) / len(loads)
+        avg_kb = sum(load[2] for load in loads) / len(loads) / 1024
+        print(f"{name:<10} {startup:>10.2f} {avg_load:>11.2f} {avg_kb:>9.0f}")
+
+
+if __name__ == "__main__":
+    timing_report(sys.argv[1:] or ["https://vanderbilt.maps.arcgis.com/home/index.html"])
@@ -0,0 +1,143 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class Checkpoint:
+    """Append-only log of the last completed page and row of a browser run.
+
+    Each completed row adds one JSON line, so a crash can at worst lose the
+    line being written; ``last`` ignores a truncated final line. Rows on a
+    page are scraped from the last index down to 0, so row 0 marks the page
+    as complete.
+
+    Rows handed to a buffered writer are not saved yet, so their positions
+    are tracked first and only recorded once the row has been written (see
+    written) or turned out to need no write (see skipped). The checkpoint
+    then advances over every position up to the first row still pending.
+    Rows held back to be scraped again later are tracked under a placeholder
+    key until they are (see resolve).
+    """
+
+    def __init__(self, path: str = 'agol_checkpoint.jsonl'):
+        self.path = path
+        self._checked_tail = False
+        # [page, row, item_id, done] in the order the rows were scraped
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def track(self, page: int, row, item_id=None):
+        """Note the position of a row about to be saved.
+
+        Without an ``item_id`` there is nothing to wait for. A ``row`` of
+        None tracks an item without recording a position for it.
+        """
+        with self._lock:
+            self._pending.append([page, row, item_id, item_id is None])
+            self._advance()
+
+    def resolve(self, key, item_id):
+        """The row tracked under the placeholder ``key`` turned out to be ``item_id``.
+
+        For rows tracked before their ID is known. With an ``item_id`` of
+        None the row will not be written and stops being waited for.
+        """
+        with self._lock:
+            for entry in self._pending:
+                if entry[2] == key and not entry[3]:
+                    entry[2] = item_id
+                    entry[3] = item_id is None
+                    break
+            self._advance()
+
+    def skipped(self, item_id):
+        """The row just tracked for ``item_id`` will not be written, e.g. because it is unchanged."""
+        with self._lock:
+            for entry in reversed(self._pending):
+                if entry[2] == item_id and not entry[3]:
+                    entry[3] = True
+                    break
+            self._advance()
+
+    def written(self, rows):
+        """Rows have been saved by the writer; usable as its on_flush callback."""
+        with self._lock:
+            for row in rows:
+                for entry in self._pending:
+                    if entry[2] == row[1] and not entry[3]:
+                        entry[3] = True
+                        break
+            self._advance()
+
+    def forget_pending(self):
+        """Stop waiting for tracked rows, e.g. after the scrape they came from failed."""
+        with self._lock:
+            self._pending.clear()
+
+    def _advance(self):
+        last = None
+        while self._pending and self._pending[0][3]:
+            page, row, _, _ = self._pending.popleft()
+            if row is not None:
+                last = (page, row)
+        if last:
+            self.record(*last)
+
+    def record(self, page: int, row: int):
+        with open(self.path, 'a') as f:
+            if not self._checked_tail:
+                # Start on a fresh line if a crash left a partial line behind
+                if f.tell() and not self._ends_with_newline():
+                    f.write('\n')
+                self._checked_tail = True
+            f.write(json.dumps({'page': page, 'row': row, 'time': time.time()}) + '\n')
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def last(self, tail_bytes: int = 4096):
+        """Return (page, row) of the last completed row, or None.
+
+        Only the end of the file is read, since a long run leaves one line per row.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(max(0, f.seek(0, os.SEEK_END) - tail_bytes))
+                lines = f.read().decode('utf-8', errors='replace').splitlines()
+        except FileNotFoundError:
+            return None
+        for line in reversed(lines):
+            try:
+                entry = json.loads(line)
+                return entry['page'], entry['row']
+            except (ValueError, KeyError):
+                continue
+        return None
+
+    def resume_point(self, start_page: int = 1):
+        """Return the page to start from and, if it was half done, the row to resume below."""
+        last = self.last()
+        if last is None:
+            return start_page, None
+        page, row = last
+        if row == 0:
+            page, row = page + 1, None
+        if page < start_page:
+            return start_page, None
+        logger.info(f"Resuming from checkpoint at page {page}" + (f", row {row - 1}" if row else ""))
+        return page, row
+
+    def clear(self):
+        self.forget_pending()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self._checked_tail = False
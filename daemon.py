@@ -0,0 +1,282 @@
+"""Keep the inventory in sync continuously from one warm, logged-in browser.
+
+InventoryDaemon logs in once and then re-syncs the Org content every
+``interval`` seconds without restarting Chrome. It re-reads the session
+before it expires and recycles the browser after a number of pages. A small
+HTTP server on localhost reports its health and status:
+
+    GET /health   200 while syncs succeed, 503 once they fail or stall
+    GET /status   JSON: state, sync counts, last error, session expiry, last run report
+    GET /metrics  the current or last sync's run report in Prometheus text format
+
+    python daemon.py --interval 300 --recycle-after 200 --port 8765
+"""
+import json
+import time
+import signal
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from selenium.common.exceptions import WebDriverException
+
+from passts import PORTAL_URL, AGOLScraper
+from agol_rest import token_is_valid
+from browser_profile import LEAN_PROFILE
+from credentials import AGOL_USERNAME, AGOL_PASSWORD
+
+logger = logging.getLogger(__name__)
+
+
+class InventoryDaemon:
+    """Run ``scraper`` on a schedule, keeping its browser and login between syncs.
+
+    Each sync scrapes with ``since_last_sync`` (only items updated since the
+    previous sync) unless ``full`` is set. Once the cached session has less
+    than ``refresh_margin`` seconds left the daemon logs in again, which may
+    need a Duo approval, rather than letting it lapse mid-sync. After
+    ``recycle_after`` pages the browser is restarted from the cached session
+    to release the memory Chrome accumulates.
+    """
+
+    def __init__(self, scraper, username: str, password: str, interval: float = 300,
+                 recycle_after: int = 200, refresh_margin: float = 600, full: bool = False,
+                 workers: int = 1, backend: str = 'browser', host: str = '127.0.0.1',
+                 port: int = 8765):
+        self.scraper = scraper
+        self.username = username
+        self.password = password
+        self.interval = interval
+        self.recycle_after = recycle_after
+        self.refresh_margin = refresh_margin
+        self.full = full
+        self.workers = workers
+        self.backend = backend
+        self.address = (host, port)
+        self.stop_event = threading.Event()
+        self.status = {
+            'state': 'starting',
+            'started_at': time.time(),
+            'syncs': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'last_sync_at': None,
+            'last_success_at': None,
+            'last_duration': None,
+            'last_error': None,
+            'next_sync_at': None,
+            'pages_since_recycle': 0,
+            'recycles': 0,
+            'session_expires_at': None,
+        }
+        self.last_report = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def _set(self, **changes):
+        with self._lock:
+            self.status.update(changes)
+
+    def healthy(self):
+        """Whether the last sync succeeded and the loop has not stalled."""
+        with self._lock:
+            status = dict(self.status)
+        if status['consecutive_failures']:
+            return False
+        # Allow a generous margin for a slow sync before calling the loop stalled
+        last = status['last_success_at'] or status['started_at']
+        return time.time() - last < 3 * self.interval + 600
+
+    # Browser and session
+
+    def _start_browser(self):
+        self._set(state='logging_in')
+        self.scraper._start_session(
+            self.username, self.password, capture_network=self.backend == 'network'
+        )
+        self._set(pages_since_recycle=0, session_expires_at=self._session_expiry())
+
+    def _stop_browser(self):
+        self.scraper._quit_driver()
+        self.scraper._last_item_id = None
+
+    def _session_expiry(self):
+        cache = self.scraper.session_cache
+        return cache.expires_at() if cache else None
+
+    def _refresh_session(self):
+        """Re-read the browser's cookies and token, logging in again if they expire soon or are rejected."""
+        scraper = self.scraper
+        # Keeps the login's original expiry; re-saving must not push the deadline back
+        scraper._save_session(keep_expiry=True)
+        expires_at = self._session_expiry()
+        self._set(session_expires_at=expires_at)
+        if scraper.token and not token_is_valid(PORTAL_URL, scraper.token):
+            logger.info("Portal rejected the session's token, logging in again")
+        elif expires_at is None or expires_at - time.time() > self.refresh_margin:
+            return
+        else:
+            logger.info("Session expires soon, logging in again")
+        if scraper.session_cache:
+            scraper.session_cache.clear()
+        self._stop_browser()
+        self._start_browser()
+
+    def _recycle_if_due(self):
+        with self._lock:
+            due = self.status['pages_since_recycle'] >= self.recycle_after
+        if due:
+            logger.info(f"Recycling the browser after {self.recycle_after} pages")
+            self._stop_browser()
+            with self._lock:
+                self.status['recycles'] += 1
+            # The session cache lets the new browser skip login
+            self._start_browser()
+
+    # Sync loop
+
+    def sync_once(self):
+        """Run one sync in the warm browser, starting it first if needed."""
+        scraper = self.scraper
+        scraper.metrics.reset()
+        start = time.time()
+        self._set(state='syncing', last_sync_at=start)
+        try:
+            if scraper.driver is None:
+                self._start_browser()
+            else:
+                self._refresh_session()
+                self._recycle_if_due()
+                scraper._reload_content()
+
+            watermark = None
+            if scraper.state:
+                scraper._load_sheet_rows()
+                if not self.full:
+                    watermark = scraper.state.watermark()
+            pages = scraper._sync(self.backend, 1, None, self.workers, watermark)
+            scraper.writer.flush()
+            if scraper.checkpoint:
+                scraper.checkpoint.clear()
+        except Exception as e:
+            logger.error(f"Sync failed: {e}")
+            scraper.metrics.error('run')
+            if isinstance(e, WebDriverException):
+                # Start over with a fresh browser on the next sync
+                self._stop_browser()
+            scraper._abandon_pending_rows()
+            with self._lock:
+                self.status['failures'] += 1
+                self.status['consecutive_failures'] += 1
+                self.status['last_error'] = str(e)
+            return False
+        finally:
+            self.last_report = scraper.metrics.summary()
+            scraper._write_run_report()
+            scraper.wait_timeouts.save()
+            with self._lock:
+                self.status['syncs'] += 1
+                self.status['last_duration'] = time.time() - start
+                self.status['state'] = 'idle'
+        with self._lock:
+            self.status['pages_since_recycle'] += pages
+            self.status['consecutive_failures'] = 0
+            self.status['last_success_at'] = time.time()
+        logger.info(f"Sync finished: {pages} pages in {time.time() - start:.1f} s")
+        return True
+
+    def run(self):
+        """Sync every ``interval`` seconds until stop() is called or the process is signalled."""
+        self._start_server()
+        try:
+            while not self.stop_event.is_set():
+                self.sync_once()
+                next_sync = time.time() + self.interval
+                self._set(next_sync_at=next_sync)
+                self.stop_event.wait(self.interval)
+        finally:
+            self._set(state='stopping')
+            try:
+                self.scraper.writer.close()
+            except Exception as e:
+                logger.error(f"Failed to flush {len(self.scraper.writer)} rows: {e}")
+            if self.scraper.enricher:
+                self.scraper.enricher.close()
+            self._stop_browser()
+            if self._server:
+                self._server.shutdown()
+            logger.info("Daemon stopped")
+
+    def stop(self, *_):
+        self.stop_event.set()
+
+    # Status endpoint
+
+    def _start_server(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    ok = daemon.healthy()
+                    self._send(200 if ok else 503, 'application/json',
+                               json.dumps({'status': 'ok' if ok else 'failing'}))
+                elif self.path == '/status':
+                    with daemon._lock:
+                        body = {**daemon.status, 'last_report': daemon.last_report}
+                    self._send(200, 'application/json', json.dumps(body, indent=2))
+                elif self.path == '/metrics':
+                    self._send(200, 'text/plain; version=0.0.4', daemon.scraper.metrics.prometheus_text())
+                else:
+                    self._send(404, 'text/plain', 'Not found\n')
+
+            def _send(self, code, content_type, body):
+                data = body.encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        threading.Thread(target=self._server.serve_forever, name="status-server", daemon=True).start()
+        logger.info(f"Status endpoint on http://{self.address[0]}:{self._server.server_port}/status")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interval', type=float, default=300, help="seconds between syncs")
+    parser.add_argument('--recycle-after', type=int, default=200,
+                        help="restart the browser after this many pages")
+    parser.add_argument('--refresh-margin', type=float, default=600,
+                        help="log in again when the session has fewer seconds left")
+    parser.add_argument('--full', action='store_true', help="scrape every page on every sync")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--backend', choices=('browser', 'rest', 'network'), default='browser')
+    parser.add_argument('--headless', action='store_true', help="use the lean headless profile")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--credentials', default='webscrapper-451218-e78f0e8c5073.json')
+    parser.add_argument('--sheet', default="AGOL Inventory(t)")
+    args = parser.parse_args()
+
+    scraper = AGOLScraper(
+        credentials_path=args.credentials,
+        sheet_name=args.sheet,
+        profile=LEAN_PROFILE if args.headless else None,
+    )
+    daemon = InventoryDaemon(
+        scraper, AGOL_USERNAME, AGOL_PASSWORD, args.interval, args.recycle_after,
+        args.refresh_margin, args.full, args.workers, args.backend, args.host, args.port,
+    )
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+
+
+if __name__ == "__main__":
+    main()
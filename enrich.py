@@ -0,0 +1,213 @@
+"""Optional enrichment of inventory rows with per-item metadata.
+
+ItemEnricher fetches ``content/items/<id>`` for each scraped item with
+aiohttp, many requests at a time over one pooled connection, and appends
+ENRICHED_COLUMNS to the row: size, views, tags, created date, folder and
+the services the item depends on. Details are cached in SQLite keyed by
+item ID and last updated date, so an unchanged item is never fetched again.
+Note that cached view counts only refresh once the item itself changes.
+"""
+import json
+import time
+import random
+import asyncio
+import sqlite3
+import logging
+import threading
+from itertools import islice
+
+from agol_rest import format_modified
+
+logger = logging.getLogger(__name__)
+
+ENRICHED_COLUMNS = ('size', 'views', 'tags', 'created', 'folder', 'services')
+
+# Item types whose data lists the layers they draw from
+MAP_TYPES = ('Web Map', 'Web Scene')
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class EnrichmentCache:
+    """SQLite cache of item details, valid while the item's last updated date is unchanged."""
+
+    def __init__(self, path: str = 'agol_enrichment.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS details (
+                id TEXT PRIMARY KEY,
+                last_updated TEXT,
+                details TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def get(self, item_id, last_updated):
+        found = self.conn.execute(
+            "SELECT details FROM details WHERE id = ? AND last_updated IS ?",
+            (item_id, last_updated),
+        ).fetchone()
+        return json.loads(found[0]) if found else None
+
+    def put(self, item_id, last_updated, details):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO details (id, last_updated, details, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                (item_id, last_updated, json.dumps(details), time.time()),
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def item_details(item, folders=None, layer_urls=()):
+    """ENRICHED_COLUMNS values for an item JSON, given its owner's folders and its data's layer URLs."""
+    services = []
+    if item.get('url') and 'Service' in (item.get('type') or ''):
+        services.append(item['url'])
+    services += [url for url in layer_urls if url not in services]
+    folder_id = item.get('ownerFolder')
+    return [
+        item.get('size'),
+        item.get('numViews'),
+        ', '.join(item.get('tags') or []) or None,
+        format_modified(item.get('created')),
+        (folders or {}).get(folder_id, folder_id) if folder_id else None,
+        ', '.join(services) or None,
+    ]
+
+
+class ItemEnricher:
+    """Append ENRICHED_COLUMNS to inventory rows, fetching at most ``concurrency`` items at once.
+
+    Requests run on an event loop in a background thread, so connections
+    are pooled across calls until close(). Quota and server errors are
+    retried up to ``max_attempts`` times; an item that still fails gets
+    empty columns and is fetched again next time.
+    """
+
+    def __init__(self, portal_url: str, token: str, concurrency: int = 8, cache=None,
+                 timeout: float = 30, max_attempts: int = 3):
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise RuntimeError("Item enrichment needs the aiohttp package") from e
+        self._aiohttp = aiohttp
+        self.portal_url = portal_url.rstrip('/')
+        self.token = token
+        self.concurrency = concurrency
+        self.cache = cache
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._folders = {}
+
+    def _start(self):
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="enricher", daemon=True).start()
+
+        async def open_session():
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            return self._aiohttp.ClientSession(
+                connector=self._aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=self._aiohttp.ClientTimeout(total=self.timeout),
+            )
+        self._session = self._run(open_session())
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self):
+        """Close the connection pool and stop the event loop."""
+        if self._loop is None:
+            return
+        self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
+        self._session = None
+        self._folders = {}
+
+    def enrich(self, rows):
+        """Return ``rows`` with ENRICHED_COLUMNS appended, fetching the items not in the cache."""
+        rows = [list(row) for row in rows]
+        details = [None] * len(rows)
+        missing = []
+        for i, row in enumerate(rows):
+            if row[1] and self.cache:
+                details[i] = self.cache.get(row[1], row[5])
+            if details[i] is None and row[1]:
+                missing.append(i)
+        if missing:
+            if self._loop is None:
+                self._start()
+            fetched = self._run(self._fetch_all([rows[i][1] for i in missing]))
+            for i, found in zip(missing, fetched):
+                details[i] = found
+                if found is not None and self.cache:
+                    self.cache.put(rows[i][1], rows[i][5], found)
+        logger.info(f"Enriched {len(rows)} rows, {len(missing)} fetched")
+        return [row + (found or [None] * len(ENRICHED_COLUMNS)) for row, found in zip(rows, details)]
+
+    def enrich_stream(self, rows, batch_size=None):
+        """Enrich an iterable of rows lazily, one batch of requests at a time."""
+        rows = iter(rows)
+        batch_size = batch_size or self.concurrency * 4
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield from self.enrich(batch)
+
+    async def _fetch_all(self, item_ids):
+        return await asyncio.gather(*(self._fetch_item(item_id) for item_id in item_ids))
+
+    async def _fetch_item(self, item_id):
+        try:
+            item = await self._get(f"content/items/{item_id}")
+            layer_urls = []
+            if item.get('type') in MAP_TYPES:
+                data = await self._get(f"content/items/{item_id}/data")
+                layers = (data or {}).get('operationalLayers', []) + (data or {}).get('tables', [])
+                layer_urls = [layer['url'] for layer in layers if layer.get('url')]
+            folders = await self._owner_folders(item.get('owner')) if item.get('ownerFolder') else {}
+            return item_details(item, folders, layer_urls)
+        except Exception as e:
+            logger.error(f"Could not enrich item {item_id}: {e}")
+            return None
+
+    async def _owner_folders(self, owner):
+        """Folder titles by ID for ``owner``, fetched once per owner."""
+        if owner not in self._folders:
+            self._folders[owner] = asyncio.ensure_future(self._fetch_folders(owner))
+        return await self._folders[owner]
+
+    async def _fetch_folders(self, owner):
+        try:
+            user = await self._get(f"content/users/{owner}", num=1)
+        except Exception as e:
+            # Listing another user's folders needs admin privileges; fall back to folder IDs
+            logger.warning(f"Could not list folders of {owner}: {e}")
+            return {}
+        return {folder['id']: folder['title'] for folder in user.get('folders', [])}
+
+    async def _get(self, path: str, **params):
+        """GET a sharing REST resource, retrying quota and server errors with jittered backoff."""
+        params.update(f='json', token=self.token)
+        url = f"{self.portal_url}/sharing/rest/{path}"
+        for attempt in range(1, self.max_attempts + 1):
+            async with self._semaphore:
+                async with self._session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUSES or attempt == self.max_attempts:
+                        response.raise_for_status()
+                        data = await response.json(content_type=None)
+                        break
+            await asyncio.sleep(random.uniform(0, 0.5 * 2 ** attempt))
+        # The REST API reports errors with HTTP 200 and an "error" body
+        if isinstance(data, dict) and 'error' in data:
+            error = data['error']
+            raise RuntimeError(f"ArcGIS REST error {error.get('code')}: {error.get('message')}")
+        return data
@@ -0,0 +1,293 @@
+"""Local, indexed copy of the inventory for fast queries without the Google Sheet.
+
+The scraper keeps agol_inventory.db up to date through IndexSink, next to
+its other outputs. InventoryIndex is an SQLite table with one row per item,
+indexed on owner, type, sharing and last updated date, with full-text
+search on titles. last_updated is parsed into a timestamp when a row is
+written, so date filters are plain comparisons.
+
+    python inventory_index.py --owner jdoe --sharing Public
+    python inventory_index.py --type "Web Map" --older-than 365
+    python inventory_index.py --search "parcel*" --format json
+"""
+import csv
+import sys
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from sinks import ROW_COLUMNS, BufferedSink
+from state_store import parse_last_updated
+
+logger = logging.getLogger(__name__)
+
+# Inventory columns (sinks.ROW_COLUMNS and enrich.ENRICHED_COLUMNS) and their SQL types
+INDEX_COLUMNS = {
+    'id': 'TEXT PRIMARY KEY',
+    'title': 'TEXT',
+    'type': 'TEXT COLLATE NOCASE',
+    'owner': 'TEXT COLLATE NOCASE',
+    'sharing': 'TEXT COLLATE NOCASE',
+    'last_updated': 'TEXT',
+    'size': 'INTEGER',
+    'views': 'INTEGER',
+    'tags': 'TEXT',
+    'created': 'TEXT',
+    'folder': 'TEXT',
+    'services': 'TEXT',
+}
+
+# Columns printed by the query CLI unless --columns is given
+DEFAULT_OUTPUT = ('title', 'id', 'type', 'owner', 'sharing', 'last_updated')
+
+
+def fts_query(text: str):
+    """Full-text query matching titles containing every word of ``text``.
+
+    Each word is quoted, so punctuation such as '-' is matched literally
+    rather than read as query syntax; a trailing * still matches prefixes.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def to_timestamp(value):
+    """Unix time of a last_updated or created cell, or None if it is not a known format."""
+    parsed = parse_last_updated(value)
+    return parsed.timestamp() if parsed else None
+
+
+class InventoryIndex:
+    """SQLite inventory keyed by item ID, with query helpers.
+
+    ``updated_ts`` and ``created_ts`` hold last_updated and created as Unix
+    times. Safe to share between the scraping thread and the writer thread.
+    """
+
+    def __init__(self, path: str = 'agol_inventory.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        columns = ',\n'.join(f"{name} {kind}" for name, kind in INDEX_COLUMNS.items())
+        self.conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS items (
+                {columns},
+                updated_ts REAL,
+                created_ts REAL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS items_owner ON items (owner);
+            CREATE INDEX IF NOT EXISTS items_type ON items (type);
+            CREATE INDEX IF NOT EXISTS items_sharing ON items (sharing);
+            CREATE INDEX IF NOT EXISTS items_updated ON items (updated_ts);
+        """)
+        self.fts = self._create_fts()
+
+    def _create_fts(self):
+        """Create the title search table, kept in step with items by triggers. False without FTS5."""
+        try:
+            self.conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS titles USING fts5(
+                    title, content='items', content_rowid='rowid'
+                );
+                CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+                    INSERT INTO titles (rowid, title) VALUES (new.rowid, new.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+                    INSERT INTO titles (titles, rowid, title) VALUES ('delete', old.rowid, old.title);
+                END;
+                CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE OF title ON items BEGIN
+                    INSERT INTO titles (titles, rowid, title) VALUES ('delete', old.rowid, old.title);
+                    INSERT INTO titles (rowid, title) VALUES (new.rowid, new.title);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5: title search falls back to LIKE
+            logger.warning(f"Full-text title search unavailable: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def upsert(self, rows, columns):
+        """Insert or replace rows whose values are in ``columns`` order; rows without an ID are skipped."""
+        names = [name for name in columns if name in INDEX_COLUMNS]
+        now = time.time()
+        records = []
+        for row in rows:
+            item = dict(zip(columns, row))
+            if not item.get('id'):
+                continue
+            records.append([item.get(name) for name in names] + [
+                to_timestamp(item.get('last_updated')), to_timestamp(item.get('created')), now,
+            ])
+        if not records:
+            return
+        names += ['updated_ts', 'created_ts', 'indexed_at']
+        updates = ', '.join(f"{name} = excluded.{name}" for name in names if name != 'id')
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO items ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}",
+                records,
+            )
+
+    def query(self, owner=None, type=None, sharing=None, search=None, updated_before=None,
+              updated_after=None, limit=None):
+        """Items matching every given filter, most recently updated first, as dicts.
+
+        ``owner``, ``type`` and ``sharing`` match exactly, ignoring case.
+        ``search`` matches titles containing all of its words; end a word
+        with * to match it as a prefix, e.g. 'parcel*'.
+        ``updated_before`` and ``updated_after`` are datetimes.
+        """
+        sql, params = self._where(owner, type, sharing, search, updated_before, updated_after)
+        sql = f"SELECT items.* FROM items{sql} ORDER BY updated_ts IS NULL, updated_ts DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params)]
+
+    def count(self, **filters):
+        """Number of items matching the filters query() takes."""
+        sql, params = self._where(**filters)
+        with self._lock:
+            return self.conn.execute(f"SELECT COUNT(*) FROM items{sql}", params).fetchone()[0]
+
+    def _where(self, owner=None, type=None, sharing=None, search=None, updated_before=None,
+               updated_after=None):
+        clauses, params = [], []
+        for column, value in (('owner', owner), ('type', type), ('sharing', sharing)):
+            if value is not None:
+                clauses.append(f"items.{column} = ?")
+                params.append(value)
+        if updated_before is not None:
+            clauses.append("items.updated_ts < ?")
+            params.append(updated_before.timestamp())
+        if updated_after is not None:
+            clauses.append("items.updated_ts >= ?")
+            params.append(updated_after.timestamp())
+        if search and search.strip('* '):
+            if self.fts:
+                clauses.append("items.rowid IN (SELECT rowid FROM titles WHERE titles MATCH ?)")
+                params.append(fts_query(search))
+            else:
+                clauses.append("items.title LIKE ?")
+                params.append(f"%{search.strip('*')}%")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class IndexSink(BufferedSink):
+    """Keep an InventoryIndex at ``path`` up to date with every written row.
+
+    The index is opened on the first flush, even one with nothing to write,
+    so a run with no changes still leaves an index to query. If it is empty
+    then, it is first filled from ``seed``, a function returning rows in
+    ROW_COLUMNS order, so items an earlier run already wrote elsewhere are
+    not missing from it.
+    """
+
+    phase = 'index_write'
+
+    def __init__(self, path: str = 'agol_inventory.db', seed=None, batch_size: int = 100,
+                 flush_interval: float = 10.0, on_flush=None, metrics=None):
+        super().__init__(batch_size, flush_interval, on_flush, metrics)
+        self.path = path
+        self.seed = seed
+        self.index = None
+
+    def _open(self):
+        if self.index is None:
+            self.index = InventoryIndex(self.path)
+            if self.seed and not len(self.index):
+                self.index.upsert(self.seed(), ROW_COLUMNS)
+                logger.info(f"Seeded the inventory index with {len(self.index)} known items")
+        return self.index
+
+    def flush(self):
+        self._open()
+        return super().flush()
+
+    def write_rows(self, rows):
+        self._open().upsert(rows, self.columns)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self.index is not None:
+                self.index.close()
+                self.index = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--index', default='agol_inventory.db')
+    parser.add_argument('--owner')
+    parser.add_argument('--type', help='item type, e.g. "Web Map"')
+    parser.add_argument('--sharing', help="Public, Organization, Groups or Owner")
+    parser.add_argument('--search', help="words the title must contain; end one with * to match a prefix")
+    parser.add_argument('--older-than', type=float, metavar='DAYS',
+                        help="only items not updated in this many days")
+    parser.add_argument('--newer-than', type=float, metavar='DAYS',
+                        help="only items updated in the last this many days")
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--count', action='store_true', help="print only the number of matches")
+    parser.add_argument('--columns', default=','.join(DEFAULT_OUTPUT))
+    parser.add_argument('--format', choices=('table', 'csv', 'json'), default='table')
+    args = parser.parse_args()
+
+    now = datetime.now()
+    filters = {
+        'owner': args.owner,
+        'type': args.type,
+        'sharing': args.sharing,
+        'search': args.search,
+        'updated_before': now - timedelta(days=args.older_than) if args.older_than else None,
+        'updated_after': now - timedelta(days=args.newer_than) if args.newer_than else None,
+    }
+    index = InventoryIndex(args.index)
+    try:
+        if args.count:
+            print(index.count(**filters))
+            return
+        items = index.query(limit=args.limit, **filters)
+    finally:
+        index.close()
+
+    columns = args.columns.split(',')
+    if args.format == 'json':
+        json.dump(items, sys.stdout, indent=2)
+        print()
+    elif args.format == 'csv':
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows([item.get(name) for name in columns] for item in items)
+    else:
+        widths = {name: max([len(name)] + [len(str(item.get(name) or '')) for item in items])
+                  for name in columns}
+        print('  '.join(name.ljust(widths[name]) for name in columns))
+        for item in items:
+            print('  '.join(str(item.get(name) or '').ljust(widths[name]) for name in columns).rstrip())
+        print(f"{len(items)} items", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
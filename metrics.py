@@ -0,0 +1,158 @@
+"""Per-phase timing for scraper runs.
+
+RunMetrics records how long each phase of a run takes, plus error and retry
+counts, and writes them as a JSON summary and a Prometheus text-format file.
+"""
+import json
+import time
+import random
+import threading
+import functools
+from contextlib import contextmanager
+from collections import defaultdict
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class RunMetrics:
+    """Durations per phase and error/retry counters for one run. Thread-safe.
+
+    Count, total and max are exact. Percentiles come from a uniform random
+    sample of at most ``max_samples`` durations per phase, so memory stays
+    flat however many rows a run scrapes.
+    """
+
+    def __init__(self, max_samples: int = 10000):
+        self.started_at = time.time()
+        self.max_samples = max_samples
+        self.durations = defaultdict(list)
+        # phase -> [count, total, max]
+        self.totals = defaultdict(lambda: [0, 0.0, 0.0])
+        self.errors = defaultdict(int)
+        self.retries = defaultdict(int)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str):
+        """Time the enclosed block as one sample of ``phase``; exceptions count as errors."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(phase)
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._add(phase, elapsed)
+
+    def _add(self, phase, elapsed):
+        totals = self.totals[phase]
+        totals[0] += 1
+        totals[1] += elapsed
+        totals[2] = max(totals[2], elapsed)
+        samples = self.durations[phase]
+        if len(samples) < self.max_samples:
+            samples.append(elapsed)
+        else:
+            # Reservoir sampling keeps every duration equally likely to be in the sample
+            slot = random.randrange(totals[0])
+            if slot < self.max_samples:
+                samples[slot] = elapsed
+
+    def reset(self):
+        """Forget every sample and counter and restart the run clock."""
+        with self._lock:
+            self.started_at = time.time()
+            self.durations.clear()
+            self.totals.clear()
+            self.errors.clear()
+            self.retries.clear()
+
+    def error(self, phase: str):
+        with self._lock:
+            self.errors[phase] += 1
+
+    def retry(self, kind: str):
+        with self._lock:
+            self.retries[kind] += 1
+
+    def summary(self):
+        with self._lock:
+            phases = {
+                phase: {
+                    'count': self.totals[phase][0],
+                    'total': self.totals[phase][1],
+                    'p50': percentile(samples, 50),
+                    'p95': percentile(samples, 95),
+                    'max': self.totals[phase][2],
+                }
+                for phase, samples in self.durations.items() if samples
+            }
+            return {
+                'started_at': self.started_at,
+                'duration': time.time() - self.started_at,
+                'phases': phases,
+                'errors': dict(self.errors),
+                'retries': dict(self.retries),
+            }
+
+    def write_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def write_prometheus(self, path: str):
+        with open(path, 'w') as f:
+            f.write(self.prometheus_text())
+
+    def prometheus_text(self):
+        """The summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = [
+            "# HELP agol_phase_seconds Duration of scraper phases.",
+            "# TYPE agol_phase_seconds summary",
+        ]
+        for phase, stats in summary['phases'].items():
+            lines.append(f'agol_phase_seconds{{phase="{phase}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'agol_phase_seconds{{phase="{phase}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'agol_phase_seconds_sum{{phase="{phase}"}} {stats["total"]:.6f}')
+            lines.append(f'agol_phase_seconds_count{{phase="{phase}"}} {stats["count"]}')
+        lines += [
+            "# HELP agol_phase_seconds_max Slowest sample of each phase.",
+            "# TYPE agol_phase_seconds_max gauge",
+        ]
+        for phase, stats in summary['phases'].items():
+            lines.append(f'agol_phase_seconds_max{{phase="{phase}"}} {stats["max"]:.6f}')
+        lines += [
+            "# HELP agol_errors_total Errors per phase.",
+            "# TYPE agol_errors_total counter",
+        ]
+        for phase, count in summary['errors'].items():
+            lines.append(f'agol_errors_total{{phase="{phase}"}} {count}')
+        lines += [
+            "# HELP agol_retries_total Retries by kind.",
+            "# TYPE agol_retries_total counter",
+        ]
+        for kind, count in summary['retries'].items():
+            lines.append(f'agol_retries_total{{kind="{kind}"}} {count}')
+        lines += [
+            "# HELP agol_run_duration_seconds Wall-clock duration of the run.",
+            "# TYPE agol_run_duration_seconds gauge",
+            f"agol_run_duration_seconds {summary['duration']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def timed(phase: str):
+    """Decorator timing a method as ``phase`` in its instance's ``metrics``."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.span(phase):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
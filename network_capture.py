@@ -0,0 +1,117 @@
+"""Read inventory rows from the item browser's own API traffic.
+
+The Org content page fetches its items as JSON from ``sharing/rest/search``
+before rendering them. With Chrome's performance log enabled (see
+DriverProfile's ``capture_network``), NetworkCapture picks those responses
+out of the DevTools Network events, fetches their bodies with
+``Network.getResponseBody`` and turns every item into an inventory row.
+No clicks, DOM traversal or extra requests are needed.
+"""
+import json
+import base64
+import logging
+from urllib.parse import urlparse
+
+from agol_rest import item_to_row
+
+logger = logging.getLogger(__name__)
+
+# sharing/rest paths whose JSON responses hold items
+SEARCH_PATH = '/sharing/rest/search'
+ITEM_PATH = '/sharing/rest/content/items/'
+# The portal description, whose id is the org's ID
+PORTAL_PATH = '/sharing/rest/portals/self'
+
+
+def is_item_url(url: str):
+    path = urlparse(url).path
+    # content/items/<id> itself, not sub-resources such as /data or /relatedItems
+    return path.startswith(ITEM_PATH) and '/' not in path[len(ITEM_PATH):].strip('/')
+
+
+class NetworkCapture:
+    """Collect items from the search and item JSON responses a driver's pages receive.
+
+    The driver must have been started with the ``performance`` log enabled.
+    Every call to poll() reads the log since the previous call. Items are
+    deduplicated by ID until reset(). Once the portal's own description has
+    been seen, items from other orgs, such as basemap galleries, are ignored.
+    ``missed`` counts the responses the last poll could not read.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.org_id = None
+        self._seen = set()
+        # requestId -> URL of JSON responses that have not finished loading yet
+        self._pending = {}
+        self.missed = 0
+
+    def reset(self):
+        """Forget which items were already returned, e.g. before a new sync."""
+        self._seen = set()
+
+    def poll(self):
+        """Return rows for the items in responses received since the last poll, new IDs only."""
+        rows = []
+        self.missed = 0
+        for entry in self.driver.get_log('performance'):
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError):
+                continue
+            method = message.get('method')
+            params = message.get('params', {})
+            if method == 'Network.responseReceived':
+                response = params.get('response', {})
+                url = response.get('url', '')
+                if 'json' in response.get('mimeType', '') and self._wanted(url):
+                    self._pending[params['requestId']] = url
+            elif method == 'Network.loadingFinished' and params.get('requestId') in self._pending:
+                url = self._pending.pop(params['requestId'])
+                rows += self._rows_from(url, self._body(params['requestId'], url))
+            elif method == 'Network.loadingFailed':
+                self._pending.pop(params.get('requestId'), None)
+        return rows
+
+    @staticmethod
+    def _wanted(url: str):
+        path = urlparse(url).path
+        return path.startswith(SEARCH_PATH) or path.startswith(PORTAL_PATH) or is_item_url(url)
+
+    def _body(self, request_id, url):
+        try:
+            result = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception as e:
+            # Chrome evicts bodies it no longer holds; the caller sees it in missed
+            logger.warning(f"Could not read response body of {url}: {e}")
+            self.missed += 1
+            return None
+        body = result.get('body', '')
+        if result.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8')
+        try:
+            return json.loads(body)
+        except ValueError:
+            logger.warning(f"Response of {url} is not JSON")
+            self.missed += 1
+            return None
+
+    def _rows_from(self, url: str, data):
+        if not isinstance(data, dict) or 'error' in data:
+            return []
+        path = urlparse(url).path
+        if path.startswith(PORTAL_PATH):
+            self.org_id = data.get('id') or self.org_id
+            return []
+        items = data.get('results', []) if path.startswith(SEARCH_PATH) else [data]
+        rows = []
+        for item in items:
+            item_id = item.get('id')
+            if not item_id or item_id in self._seen or 'type' not in item:
+                continue
+            if self.org_id and item.get('orgId') and item['orgId'] != self.org_id:
+                continue
+            self._seen.add(item_id)
+            rows.append(item_to_row(item))
+        return rows
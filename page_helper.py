@@ -0,0 +1,202 @@
+"""In-page helper library for reading the ArcGIS item browser.
+
+The shadow DOM paths to every field are declared once below as a spec.
+The spec is compiled into a JavaScript helper that the page keeps as
+``window.__agol``. The helper is injected into every new document through
+DevTools and, as a fallback, into the current document the first time a call
+finds it missing. After that each read is a short call such as
+``__agol.preview()`` instead of a full traversal script.
+
+To follow a markup change, edit the field's path in the spec.
+"""
+import json
+import hashlib
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+# Path step that enters the current element's shadow root; every other step
+# is a CSS selector queried from the current node
+SHADOW = '#shadow'
+
+# ``read`` is how the value is taken from the element at the end of ``path``:
+# 'text', 'value', 'item_id' (from a link's id= parameter) or 'icon' (a
+# calcite-icon name). ``labels`` replaces raw values; with ``strict`` values
+# missing from ``labels`` become null.
+Field = namedtuple('Field', 'path read labels strict', defaults=('text', None, False))
+
+# Sharing labels shown in the table, keyed by icon name
+SHARING_ICONS = {
+    'globe': 'Public',
+    'organization': 'Organization',
+    'users': 'Groups',
+    'lock': 'Owner',
+}
+
+# Path to the Preview panel's flow item, where every preview field starts
+PREVIEW_ROOT = (
+    'arcgis-browser, arcgis-item-browser', SHADOW,
+    'arcgis-item-browser-preview', SHADOW,
+    'calcite-flow calcite-flow-item',
+)
+_DETAILS = 'calcite-accordion calcite-accordion-item:nth-of-type(2)'
+
+PREVIEW_FIELDS = {
+    'title': Field(('div:nth-of-type(1) h3',)),
+    'ID': Field((
+        'calcite-accordion calcite-accordion-item:nth-of-type(4) arcgis-item-browser-preview-copy',
+        SHADOW, 'calcite-label calcite-input', SHADOW, 'input[aria-label="ID"]',
+    ), 'value'),
+    'type': Field(('div:nth-of-type(1) arcgis-item-type', SHADOW, 'span')),
+    'last_updated': Field((f'{_DETAILS} div p:nth-of-type(2)',)),
+    'Owner': Field((
+        f'{_DETAILS} arcgis-user-popup', SHADOW, 'button slot arcgis-user-avatar', SHADOW, 'span span',
+    )),
+    'Sharing': Field((f'{_DETAILS} arcgis-item-share-summary', SHADOW, 'div span.text'),
+                     labels={'Everyone (public)': 'Public'}),
+}
+
+# Table fields start at each row's shadow root
+TABLE_ROW = 'arcgis-item-browser-table-row'
+TABLE_FIELDS = {
+    'title': Field(('a[href*="id="]',)),
+    'ID': Field(('a[href*="id="]',), 'item_id'),
+    'type': Field(('arcgis-item-type', SHADOW, 'span')),
+    'last_updated': Field(('[data-column="modified"], .modified',)),
+    'Owner': Field(('arcgis-user-avatar', SHADOW, 'span span')),
+    'Sharing': Field(('[data-column="sharing"] calcite-icon, .sharing calcite-icon',), 'icon',
+                     labels=SHARING_ICONS, strict=True),
+}
+
+
+def compile_spec():
+    """The spec as JSON, ready to embed in the helper."""
+    def fields(spec):
+        return {name: field._asdict() for name, field in spec.items()}
+    return json.dumps({
+        'shadow': SHADOW,
+        'previewRoot': PREVIEW_ROOT,
+        'preview': fields(PREVIEW_FIELDS),
+        'tableRow': TABLE_ROW,
+        'table': fields(TABLE_FIELDS),
+    })
+
+
+_SPEC_JSON = compile_spec()
+# Changes whenever the spec does, so a page holding an older helper gets the new one
+HELPER_VERSION = hashlib.sha1(_SPEC_JSON.encode('utf-8')).hexdigest()[:12]
+
+HELPER_JS = """
+(function () {
+    const spec = %s;
+    const version = %s;
+    if (window.__agol && window.__agol.version === version) return;
+
+    // Compile a path into a function from a start node to the element it names
+    function compilePath(path) {
+        return function (node) {
+            for (const step of path) {
+                if (!node) return null;
+                node = step === spec.shadow ? node.shadowRoot : node.querySelector(step);
+            }
+            return node || null;
+        };
+    }
+
+    const readers = {
+        text: (el) => el.textContent.trim() || null,
+        value: (el) => (el.value || '').trim() || null,
+        item_id: (el) => {
+            const match = (el.href || '').match(/[?&]id=([0-9a-f]{32})/i);
+            return match ? match[1] : null;
+        },
+        icon: (el) => el.getAttribute('icon') || null,
+    };
+
+    function compileFields(fields) {
+        const compiled = Object.entries(fields).map(([name, field]) => {
+            const find = compilePath(field.path);
+            const read = readers[field.read];
+            return [name, (root) => {
+                const el = find(root);
+                let value = el ? read(el) : null;
+                if (value !== null && field.labels) {
+                    if (value in field.labels) value = field.labels[value];
+                    else if (field.strict) value = null;
+                }
+                return value;
+            }];
+        });
+        return function (root) {
+            const data = {};
+            for (const [name, read] of compiled) data[name] = root ? read(root) : null;
+            return data;
+        };
+    }
+
+    const previewRoot = compilePath(spec.previewRoot);
+    const readPreview = compileFields(spec.preview);
+    const readTableRow = compileFields(spec.table);
+
+    window.__agol = {
+        version: version,
+
+        // Fields of the item shown in the Preview panel
+        preview: () => readPreview(previewRoot(document)),
+
+        // Fields of every row on the current page, in table order
+        tableRows: () => Array.from(
+            document.querySelectorAll(spec.tableRow), (row) => readTableRow(row.shadowRoot)
+        ),
+
+        // Click the Preview button of table row ``index`` (0-based)
+        clickPreview: (index) => {
+            const rows = document.querySelectorAll(spec.tableRow);
+            if (index >= rows.length) return "No Preview button found in any row";
+            const row = rows[index];
+            if (!row.shadowRoot) return "Row has no shadow root";
+            for (const btn of row.shadowRoot.querySelectorAll('button')) {
+                if (btn.textContent.trim() === 'Preview') {
+                    btn.click();
+                    return "Found and clicked Preview button";
+                }
+            }
+            return "No Preview button found in any row";
+        },
+    };
+})();
+""" % (_SPEC_JSON, json.dumps(HELPER_VERSION))
+
+# Returned by CALL_SCRIPT when the page has no helper, or an older one
+MISSING = '__agol_missing__'
+
+# Calls helper function arguments[0] with the remaining arguments
+CALL_SCRIPT = """
+    const helper = window.__agol;
+    if (!helper || helper.version !== %s) return %s;
+    return helper[arguments[0]](...Array.prototype.slice.call(arguments, 1));
+""" % (json.dumps(HELPER_VERSION), json.dumps(MISSING))
+
+
+def inject_helper(driver):
+    """Have Chrome add the helper to every document the driver loads from now on."""
+    try:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': HELPER_JS})
+    except Exception as e:
+        # Not Chrome, or no DevTools access: call_helper installs it on demand instead
+        logger.warning(f"Could not inject page helper, installing it per document: {e}")
+
+
+def call_helper(driver, name: str, *args):
+    """Call ``window.__agol[name](*args)``, installing the helper first if the page lacks it."""
+    result = driver.execute_script(CALL_SCRIPT, name, *args)
+    if result == MISSING:
+        driver.execute_script(HELPER_JS)
+        result = driver.execute_script(CALL_SCRIPT, name, *args)
+    return result
+
+
+def read_preview(driver):
+    """Fields of the item in the Preview panel, keyed by name; usable as a wait's read function."""
+    return call_helper(driver, 'preview')
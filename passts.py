@@ -1,25 +1,234 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import gspread
 from google.oauth2.service_account import Credentials
+import copy
+import itertools
+import math
 import time
 import logging
 from credentials import AGOL_USERNAME, AGOL_PASSWORD
+from sinks import ROW_COLUMNS, BufferedSheetWriter, BackgroundWriter, MultiSink
+from waits import DEEP_FIND_JS, table_rows_rendered, preview_item_changed, page_loaded, first_match
+from agol_rest import ArcGISRestClient, token_from_driver, token_is_valid
+from session_cache import SessionCache, add_cookies, portal_cookies
+from worker_pool import WorkerPool
+from state_store import StateStore, parse_last_updated
+from checkpoint import Checkpoint
+from browser_profile import DriverProfile
+from page_helper import PREVIEW_FIELDS, call_helper, inject_helper, read_preview
+from metrics import RunMetrics, timed
+from rate_limit import RateController
+from enrich import ENRICHED_COLUMNS, EnrichmentCache, ItemEnricher
+from network_capture import NetworkCapture
+from wait_timeouts import AdaptiveTimeouts
+from inventory_index import IndexSink
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+PORTAL_URL = "https://vanderbilt.maps.arcgis.com"
+
+# Upper bounds in seconds for each kind of wait; override via AGOLScraper(timeouts=...)
+DEFAULT_TIMEOUTS = {
+    'element': 10,      # login form fields and buttons
+    'duo': 60,          # Duo device trust prompt
+    'navigation': 20,   # Org content page loading
+    'page': 20,         # Org table switching to another page
+    'preview': 10,      # Preview panel switching to the clicked item
+}
+# (floor, ceiling) in seconds for the waits whose timeouts adapt to observed latency;
+# the Duo prompt waits on a person, so it keeps its fixed timeout
+ADAPTIVE_TIMEOUT_BOUNDS = {
+    'element': (3, 30),
+    'navigation': (5, 90),
+    'page': (3, 60),
+    'preview': (2, 30),
+}
+POLL_FREQUENCY = 0.1
+
+# Clicks the pagination button for page arguments[0], or steps one page towards it
+GO_TO_PAGE_SCRIPT = DEEP_FIND_JS + """
+    const pagination = deepFind(document, 'calcite-pagination');
+    if (!pagination || !pagination.shadowRoot) return "No pagination found";
+
+    const target = arguments[0];
+    const buttons = pagination.shadowRoot.querySelectorAll('button');
+    for (const btn of buttons) {
+        if (btn.textContent.trim() === String(target)) {
+            btn.click();
+            return "Clicked page " + target;
+        }
+    }
+
+    // The target page is hidden behind an ellipsis, so use the chevrons
+    const current = Math.floor((pagination.startItem - 1) / pagination.pageSize) + 1;
+    const direction = target > current ? 'next' : 'previous';
+    for (const btn of buttons) {
+        const label = (btn.getAttribute('aria-label') || '').toLowerCase();
+        if (btn.classList.contains(direction) || label.includes(direction)) {
+            btn.click();
+            return "Stepped to " + direction + " page";
+        }
+    }
+    return "No button found for page " + target;
+"""
+
+# Sets the pagination's first item to arguments[0]; with arguments[1] also announces the
+# change the way a page button click does, so the item browser loads that page
+JUMP_TO_PAGE_SCRIPT = DEEP_FIND_JS + """
+    const pagination = deepFind(document, 'calcite-pagination');
+    if (!pagination) return false;
+    pagination.startItem = arguments[0];
+    if (arguments[1]) {
+        pagination.dispatchEvent(new CustomEvent('calcitePaginationChange', {bubbles: true, composed: true}));
+    }
+    return true;
+"""
+
+# Fallback when DevTools is unavailable; Chrome only
+HEAP_SCRIPT = "return performance.memory ? performance.memory.usedJSHeapSize : null;"
+
+# Fields read from the Preview panel, keyed as returned by page_helper.read_preview
+ROW_FIELDS = tuple(PREVIEW_FIELDS)
+
+
 class AGOLScraper:
-    def __init__(self, credentials_path: str, sheet_name: str):
+    def __init__(self, credentials_path: str, sheet_name: str, sheet=None,
+                 batch_size: int = 100, flush_interval: float = 60.0, timeouts=None,
+                 session_path: str = 'agol_session.json', state_path: str = 'agol_state.db',
+                 checkpoint_path: str = 'agol_checkpoint.jsonl', profile=None,
+                 table_extraction: bool = False, report_path: str = 'agol_run_report',
+                 write_queue_size: int = 500, sinks=None,
+                 rate_limit=None, enrich: bool = False, enrich_concurrency: int = 8,
+                 enrich_cache_path: str = 'agol_enrichment.db', heap_limit_mb: float = 512,
+                 adaptive_timeouts: bool = True, index_path: str = 'agol_inventory.db'):
         self.credentials_path = credentials_path
         self.sheet_name = sheet_name
-        self.sheet = self._initialize_sheets()
+        # An explicit worksheet (e.g. sinks.InMemoryWorksheet) skips the Sheets API;
+        # with other sinks and no sheet_name the scraper runs without Google credentials
+        self.sheet = sheet
+        if sheet is None and sheet_name:
+            try:
+                self.sheet = self._initialize_sheets()
+            except Exception:
+                if not sinks:
+                    raise
+                logger.error("Continuing without Google Sheets")
+        # Phase timings, written to report_path + '.json' / '.prom' at the end of run()
+        self.metrics = RunMetrics()
+        self.report_path = report_path
+        # Set state_path=None to write every scraped row instead of only new or changed items
+        self.state = StateStore(state_path) if state_path else None
+        # Append enrich.ENRICHED_COLUMNS (size, views, tags, ...) fetched per item from the REST API
+        self.enrich = enrich
+        self.enrich_concurrency = enrich_concurrency
+        self.enrich_cache_path = enrich_cache_path
+        self.enricher = None
+        # Paces sheet writes, learning the rate the Sheets quota allows
+        self.rate_limit = rate_limit if rate_limit is not None else RateController(metrics=self.metrics)
+        # Local queryable copy of the inventory (see inventory_index.py); None to skip it.
+        # It goes last, so the sheet stays the output whose writes count as synced
+        if index_path:
+            seed = self.state.rows if self.state else None
+            sinks = list(sinks or []) + [IndexSink(index_path, seed)]
+        # Set checkpoint_path=None to always start from start_page
+        self.checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self.writer = self._create_writer(sinks, batch_size, flush_interval)
+        # Writes happen on a background thread unless write_queue_size=0
+        if write_queue_size:
+            self.writer = BackgroundWriter(self.writer, write_queue_size)
+        self._sheet_rows = {}
+        self._seen_ids = set()
+        # Rows with missing fields, keyed by (page, row index), revisited at the end of the
+        # run; shared with worker clones
+        self._incomplete = {}
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        # Learns each wait's timeout from its past latencies, kept in the state store;
+        # with adaptive_timeouts=False every wait uses self.timeouts as is
+        self.wait_timeouts = AdaptiveTimeouts(
+            self.timeouts, ADAPTIVE_TIMEOUT_BOUNDS if adaptive_timeouts else {}, self.state
+        )
+        # Reload the Org page between pages once its JS heap passes this size; None to never reload
+        self.heap_limit = heap_limit_mb * 2 ** 20 if heap_limit_mb else None
+        self._jump_pages = True
+        # e.g. browser_profile.LEAN_PROFILE for headless Chrome with resource blocking
+        self.profile = profile or DriverProfile()
+        # Read whole pages from the table rows, opening Preview only for incomplete rows
+        self.table_extraction = table_extraction
+        # Set session_path=None to always go through the full SSO + Duo login
+        self.session_cache = SessionCache(session_path) if session_path else None
         self.driver = None
+        # network_capture.NetworkCapture of the current browser, for the 'network' backend
+        self.capture = None
+        self.token = None
+        self._last_item_id = None
+        # Login button method that worked last, per button; persisted in the state store
+        self._login_methods = {}
+
+    def _create_writer(self, sinks, batch_size: int, flush_interval: float):
+        """Combine the sheet and any extra sinks (e.g. sinks.CSVSink) into one writer.
+
+        With several outputs rows are buffered once, using ``batch_size`` and
+        ``flush_interval``, and every batch goes to each output.
+        """
+        on_flush = self._rows_written
+        outputs = list(sinks or [])
+        if self.sheet is not None:
+            outputs.insert(0, BufferedSheetWriter(
+                self.sheet, batch_size, flush_interval, rate_limit=self.rate_limit
+            ))
+        if not outputs:
+            raise ValueError("Nothing to write to: give a sheet_name, a sheet or sinks")
+        for output in outputs:
+            output.metrics = self.metrics
+            if self.enrich:
+                output.columns = ROW_COLUMNS + ENRICHED_COLUMNS
+        if len(outputs) > 1:
+            return MultiSink(outputs, batch_size, flush_interval, on_flush, self.metrics)
+        outputs[0].on_flush = on_flush
+        return outputs[0]
+
+    def _rows_written(self, rows):
+        """Called by the writer with rows it has saved: record them as synced and checkpoint them."""
+        if self.state:
+            self.state.record(rows)
+        if self.checkpoint:
+            self.checkpoint.written(rows)
+
+    def _abandon_pending_rows(self):
+        """After a failed scrape, save what the writer holds and stop waiting for rows that never reached it."""
+        try:
+            self.writer.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush {len(self.writer)} rows: {e}")
+        if self.checkpoint:
+            self.checkpoint.forget_pending()
+        # Held-back rows were still pending, so the next scrape resumes before them
+        self._incomplete = {}
+
+    def _wait(self, condition, step: str, escalate: bool = True):
+        """Poll ``condition`` until it returns a truthy value or the step's timeout expires.
+
+        A timeout lengthens the step's next wait unless ``escalate`` is False,
+        for callers that first check whether the timeout was the page's fault.
+        """
+        start = time.monotonic()
+        with self.metrics.span(f"wait_{step}"):
+            try:
+                result = WebDriverWait(
+                    self.driver, self.wait_timeouts.timeout(step), poll_frequency=POLL_FREQUENCY
+                ).until(condition)
+            except TimeoutException:
+                if escalate:
+                    self.wait_timeouts.timed_out(step)
+                raise
+        self.wait_timeouts.observe(step, time.monotonic() - start)
+        return result
 
     def _initialize_sheets(self):
         """Initialize Google Sheets connection."""
@@ -40,30 +249,50 @@ class AGOLScraper:
             logger.error(f"Failed to initialize Google Sheets: {e}")
             raise
 
-    def _setup_webdriver(self):
-        """Initialize and configure webdriver."""
-        options = webdriver.ChromeOptions()
-        options.add_argument("--start-maximized")
-        self.driver = webdriver.Chrome(options=options)
+    @timed('setup_webdriver')
+    def _setup_webdriver(self, profile=None, capture_network: bool = False):
+        """Initialize and configure webdriver.
+
+        With ``capture_network`` the browser logs its network traffic for the
+        'network' backend.
+        """
+        profile = profile or self.profile
+        if capture_network:
+            profile = profile.replace(capture_network=True)
+        self.driver = profile.create()
+        self.capture = NetworkCapture(self.driver) if profile.capture_network else None
+        inject_helper(self.driver)
+
+    def _clone(self):
+        """Return a scraper with this one's settings but no browser of its own.
+
+        Used for worker browsers; the clone shares the sheet writer, which
+        only the main thread may write to.
+        """
+        worker = copy.copy(self)
+        worker.driver = None
+        worker._last_item_id = None
+        # Workers finish pages out of order; the main thread checkpoints whole pages
+        worker.checkpoint = None
+        return worker
     
+    @timed('login')
     def _login(self, username: str, password: str):
         """Handle the login process."""
         try:
             # Navigate to login page
-            self.driver.get("https://vanderbilt.maps.arcgis.com/home/signin.html")
-            time.sleep(2)
+            self.driver.get(f"{PORTAL_URL}/home/signin.html")
 
             # Click Vanderbilt login button
-            vanderbilt_login_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, ".js-entpanel"))
+            vanderbilt_login_button = self._wait(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, ".js-entpanel")), 'element'
             )
             vanderbilt_login_button.click()
             logger.info("Clicked Vanderbilt login button")
-            time.sleep(3)
 
             # Handle username input
-            input_field = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='text']"))
+            input_field = self._wait(
+                EC.visibility_of_element_located((By.CSS_SELECTOR, "input[type='text']")), 'element'
             )
             self.driver.execute_script(
                 "arguments[0].focus(); arguments[0].value = arguments[1];", 
@@ -78,11 +307,10 @@ class AGOLScraper:
             
             # Click Next using multiple methods
             self._try_click_button("postButton", "ping-button normal allow", "Next")
-            time.sleep(5)
 
             # Handle password input
-            password_field = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input[type='password']"))
+            password_field = self._wait(
+                EC.visibility_of_element_located((By.CSS_SELECTOR, "input[type='password']")), 'element'
             )
             self.driver.execute_script(
                 "arguments[0].focus(); arguments[0].value = arguments[1];", 
@@ -97,17 +325,15 @@ class AGOLScraper:
 
             # Click Submit using multiple methods
             self._try_click_button("postButton", "ping-button normal allow", "Submit")
-            time.sleep(5)
 
             # Handle Duo device trust prompt
-            logger.info("Waiting for device trust prompt (60 seconds)...")
+            logger.info(f"Waiting for device trust prompt ({self.timeouts['duo']} seconds)...")
             try:
-                dont_trust_button = WebDriverWait(self.driver, 60).until(
-                    EC.element_to_be_clickable((By.ID, "dont-trust-browser-button"))
+                dont_trust_button = self._wait(
+                    EC.element_to_be_clickable((By.ID, "dont-trust-browser-button")), 'duo'
                 )
                 dont_trust_button.click()
                 logger.info("Clicked 'No, other people use this device' button")
-                time.sleep(2)
             except TimeoutException:
                 logger.warning("Device trust button not found or timed out")
 
@@ -119,425 +345,193 @@ class AGOLScraper:
             self.driver.save_screenshot("login_error.png")
             raise
 
-    def _try_click_button(self, button_id: str, button_class: str, button_text: str):
-        """Try multiple methods to click a button."""
-        clicked = False
-        
-        # Method 1: By ID
+    @timed('restore_session')
+    def _restore_session(self):
+        """Reuse a cached login if it is still valid. Returns True on success."""
+        if not self.session_cache:
+            return False
+        session = self.session_cache.load()
+        if not session:
+            return False
+        if session.get('token') and not token_is_valid(PORTAL_URL, session['token']):
+            logger.info("Cached session was rejected by the portal")
+            self.session_cache.clear()
+            return False
+
         try:
-            button_div = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, button_id))
-            )
-            button = button_div.find_element(By.TAG_NAME, "a")
-            button.click()
-            clicked = True
-            logger.info(f"Clicked {button_text} button by ID")
+            self._open_with_cookies(session['cookies'])
         except Exception:
-            pass
-
-        # Method 2: JavaScript
-        if not clicked:
-            try:
-                self.driver.execute_script("postOk();")
-                clicked = True
-                logger.info(f"Clicked {button_text} button by JavaScript")
-            except Exception:
-                pass
+            logger.info("Cached session did not restore a logged-in page")
+            self.session_cache.clear()
+            return False
+        self.token = session.get('token')
+        logger.info("Restored cached session, skipping login")
+        return True
+
+    def _open_with_cookies(self, cookies):
+        """Load the Org content page in this browser using another login's cookies."""
+        # Cookies can only be added once the browser is on the portal domain
+        self.driver.get(f"{PORTAL_URL}/home/index.html")
+        add_cookies(self.driver, portal_cookies(cookies))
+        self.driver.refresh()
+        self._navigate_to_content()
+
+    def _save_session(self, keep_expiry: bool = False):
+        """Cache the current login for later runs; ``keep_expiry`` re-saves it without extending it."""
+        if not self.session_cache:
+            return
+        try:
+            self.token = token_from_driver(self.driver, PORTAL_URL)
+        except Exception as e:
+            logger.warning(f"Could not read portal token: {e}")
+        try:
+            self.session_cache.save(self.driver, self.token, keep_expiry)
+        except Exception as e:
+            logger.warning(f"Failed to save session cache: {e}")
+
+    def _login_button_methods(self, button_id: str, button_class: str, button_text: str):
+        """Ways to find and click a login button, as (name, condition, click) in default order."""
+        return [
+            ('id', EC.presence_of_element_located((By.CSS_SELECTOR, f"#{button_id} a")),
+             lambda link: link.click()),
+            ('javascript', lambda driver: driver.execute_script("return typeof postOk === 'function';"),
+             lambda _: self.driver.execute_script("postOk();")),
+            ('css', EC.element_to_be_clickable((By.CSS_SELECTOR, "a." + ".".join(button_class.split()))),
+             lambda button: button.click()),
+            ('text', EC.element_to_be_clickable((By.XPATH, f"//a[contains(text(), '{button_text}')]")),
+             lambda button: button.click()),
+        ]
 
-        # Method 3: CSS Selector
-        if not clicked:
+    def _try_click_button(self, button_id: str, button_class: str, button_text: str):
+        """Click a login button with whichever method finds it first.
+
+        Every method is checked on each poll, starting with the one that
+        worked last time for this button, so a missing locator no longer
+        costs a timeout of its own. A method whose click fails is dropped and
+        the rest are polled again.
+        """
+        key = f"login_method:{button_text}"
+        if key not in self._login_methods and self.state:
+            self._login_methods[key] = self.state.get_meta(key)
+        methods = self._login_button_methods(button_id, button_class, button_text)
+        methods.sort(key=lambda method: method[0] != self._login_methods.get(key))
+
+        while methods:
             try:
-                button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, f"a.{button_class}"))
+                name, found = self._wait(
+                    first_match((name, condition) for name, condition, _ in methods), 'element'
                 )
-                button.click()
-                clicked = True
-                logger.info(f"Clicked {button_text} button by CSS selector")
-            except Exception:
-                pass
-
-        # Method 4: Text content
-        if not clicked:
+            except TimeoutException:
+                break
+            click = next(click for method, _, click in methods if method == name)
             try:
-                button = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, f"//a[contains(text(), '{button_text}')]"))
-                )
-                button.click()
-                logger.info(f"Clicked {button_text} button by text content")
-            except Exception:
-                logger.warning(f"Could not click {button_text} button")
-
+                click(found)
+            except Exception as e:
+                logger.info(f"Clicking {button_text} button by {name} failed: {e}")
+                methods = [method for method in methods if method[0] != name]
+                continue
+            logger.info(f"Clicked {button_text} button by {name}")
+            if self._login_methods.get(key) != name:
+                self._login_methods[key] = name
+                if self.state:
+                    self.state.set_meta(key, name)
+            return
+        logger.warning(f"Could not click {button_text} button")
+
+    @timed('navigate_to_content')
     def _navigate_to_content(self):
         """Navigate to the content page."""
         try:
             # Click Content button
-            content_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.ID, "esri-header-menus-link-desktop-0-5"))
+            # The content button only appears once the Duo redirect has landed
+            content_button = self._wait(
+                EC.element_to_be_clickable((By.ID, "esri-header-menus-link-desktop-0-5")), 'duo'
             )
             content_button.click()
             logger.info("Clicked Content button")
-            time.sleep(5)
 
             # Click Org button
-            org_button = WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "calcite-menu-item[data-id='org']"))
+            org_button = self._wait(
+                EC.element_to_be_clickable((By.CSS_SELECTOR, "calcite-menu-item[data-id='org']")), 'navigation'
             )
             org_button.click()
             logger.info("Clicked Org button")
-            time.sleep(5)
+
+            rows = self._wait(table_rows_rendered(), 'navigation')
+            logger.info(f"Org table rendered {rows} rows")
         except Exception as e:
             logger.error(f"Failed to navigate to content: {e}")
             raise
         
+    @timed('click_preview')
     def _click_preview_button(self,counter= 1):
-        """Click the Preview button on the first row using shadow DOM traversal."""
+        """Click the Preview button of table row ``counter`` (0-based) through the page helper."""
         try:
-            # Adjust the XPath to wait for the row based on the counter
-                # Try a more aggressive approach - find any button with 'Preview' text
-            alt_script = f"""
-                    const rows = document.querySelectorAll('arcgis-item-browser-table-row');
-                    let i = {counter};
-                    // Start the loop from index 1 to skip the first row
-                    if (i < rows.length) {{
-                        const row = rows[i];
-                        
-                        if (!row.shadowRoot) return "Row has no shadow root";
-                        
-                        const buttons = row.shadowRoot.querySelectorAll('button');
-                        for (let btn of buttons) {{
-                            if (btn.textContent.trim() === 'Preview') {{
-                                btn.click();
-                                return "Found and clicked Preview button";
-                            }}
-                        }}
-                    }}
-                    return "No Preview button found in any row";
-                """
-                
-            alt_result = self.driver.execute_script(alt_script)
-            logger.info(f"Alternative shadow DOM script result: {alt_result}")
-                
-            if "found and clicked" in alt_result.lower():
-                    logger.info("Successfully clicked Preview button with alternative method")
-                    time.sleep(3)
-                    return True
+            result = call_helper(self.driver, 'clickPreview', counter)
+            logger.info(f"Preview click result: {result}")
+
+            if result and "found and clicked" in result.lower():
+                logger.info("Successfully clicked Preview button")
+                return True
             else:
-                    logger.error("All attempts to click Preview button failed")
-                    return False    
-                
+                logger.error("All attempts to click Preview button failed")
+                self.metrics.error('click_preview')
+                return False
+
         except Exception as e:
             logger.error(f"Error in _click_preview_button: {e}")
+            self.metrics.error('click_preview')
             return False
 
-    def _get_element_text_through_shadow(self, script):
-        """Execute JavaScript to traverse shadow DOM and get text."""
-        try:
-            result = self.driver.execute_script(script)
-            return result.strip() if result else None
-        except Exception as e:
-            logger.error(f"Error executing shadow DOM script: {e}")
-            return None
+    @timed('extract_row')
+    def _extract_row_data(self, previous_id=None, expected_id=None):
+        """Extract data using JavaScript shadow DOM traversal.
 
-    def _extract_row_data(self):
-        """Extract data using JavaScript shadow DOM traversal."""
+        Polls the extraction script until the Preview panel shows an item
+        other than ``previous_id``, or ``expected_id`` when given, with every
+        field rendered, then falls back to whatever has rendered once the
+        preview timeout expires.
+        """
         try:
-            # Wait for the base row element
-            base_xpath = "//arcgis-item-browser-table-row[1]"
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, base_xpath))
-            )
-            time.sleep(2)  # Add small delay to ensure shadow DOM is fully loaded
-            
-            # JavaScript scripts for each field
-            scripts = {
-                'title': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item:nth-of-type(1)');
-                    if (!flowItem) return null;
-
-                    // Finally, find the h3 element within the first div
-                    const heading = flowItem.querySelector('div:nth-of-type(1) h3');
-                    return result = heading ? heading.textContent.trim() : null;
-                """,
-                'ID': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item');
-                    if (!flowItem) return null;
-
-                    // Navigate to the accordion
-                    const accordion = flowItem.querySelector('calcite-accordion');
-                    if (!accordion) return null;
-
-                    // Find the specific accordion item (the fifth one, as you mentioned item[4])
-                    const accordionItem = accordion.querySelector('calcite-accordion-item:nth-of-type(4)');
-                    if (!accordionItem) return null;
-
-                    // Find the browser preview copy component
-                    const browserPreviewCopy = accordionItem.querySelector('arcgis-item-browser-preview-copy');
-                    if (!browserPreviewCopy) return null;
-
-                    // Access its shadow DOM
-                    const shadow2 = browserPreviewCopy.shadowRoot;
-                    if (!shadow2) return null;
-
-                    // Find the calcite-label
-                    const calciteLabel = shadow2.querySelector('calcite-label');
-                    if (!calciteLabel) return null;
-
-                    // Find the calcite-input
-                    const calciteInput = calciteLabel.querySelector('calcite-input');
-                    if (!calciteInput) return null;
-
-                    // Access the input's shadow DOM
-                    const inputShadow = calciteInput.shadowRoot;
-                    if (!inputShadow) return null;
-
-                    // Find the input element
-                    const inputElement = inputShadow.querySelector('input[aria-label="ID"]');
-                    
-                    // Return the value, trimming any whitespace
-                    return inputElement ? inputElement.value.trim() : null;
-                """,
-
-                'type': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item:nth-of-type(1)');
-                    if (!flowItem) return null;
-
-                    // Find the item type component within the first div
-                    const itemType = flowItem.querySelector('div:nth-of-type(1) arcgis-item-type');
-                    if (!itemType) return null;
-
-                    // Access its shadow DOM
-                    const shadow2 = itemType.shadowRoot;
-                    if (!shadow2) return null;
-
-                    // Finally, find the text span
-                    const typeSpan = shadow2.querySelector('span');
-                    return result = typeSpan ? typeSpan.textContent.trim() : null;
-                """,
-                
-                'last_updated': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-                    
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-                    
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-                    
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-                    
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item');
-                    if (!flowItem) return null;
-                    
-                    // Navigate to the accordion
-                    const accordion = flowItem.querySelector('calcite-accordion');
-                    if (!accordion) return null;
-                    
-                    // Find the specific accordion item (the second one)
-                    const accordionItem = accordion.querySelector('calcite-accordion-item:nth-of-type(2)');
-                    if (!accordionItem) return null;
-
-                    const paragraph = accordionItem.querySelector('div p:nth-of-type(2)');
-                    return result = paragraph ? paragraph.textContent.trim() : null;
-                """,
-
-                'Owner': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-                    
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-                    
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-                    
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-                    
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item');
-                    if (!flowItem) return null;
-                    
-                    // Navigate to the accordion
-                    const accordion = flowItem.querySelector('calcite-accordion');
-                    if (!accordion) return null;
-                    
-                    // Find the specific accordion item (the second one)
-                    const accordionItem = accordion.querySelector('calcite-accordion-item:nth-of-type(2)');
-                    if (!accordionItem) return null;
-
-                    // Find the user popup component
-                    const userPopup = accordionItem.querySelector('arcgis-user-popup');
-                    if (!userPopup) return null;
-
-                    // Access its shadow DOM
-                    const shadow2 = userPopup.shadowRoot;
-                    if (!shadow2) return null;
-
-                    // Find the button within the user popup
-                    const button = shadow2.querySelector('button');
-                    if (!button) return null;
-
-                    // Navigate to the slot within the button
-                    const slot = button.querySelector('slot');
-                    if (!slot) return null;
-
-                    // Find the user avatar component within the slot
-                    const userAvatar = slot.querySelector('arcgis-user-avatar');
-                    if (!userAvatar) return null;
-
-                    // Access its shadow DOM
-                    const shadow3 = userAvatar.shadowRoot;
-                    if (!shadow3) return null;
-
-                    // Finally, find the span within the user avatar component
-                    const avatarSpan = shadow3.querySelector('span span');
-                    return result = avatarSpan ? avatarSpan.textContent.trim() : null;
-                """,
-
-                'Sharing': """
-                    // Start at the browser component
-                    const browsers = document.querySelector('arcgis-browser, arcgis-item-browser');
-                    if (!browsers) return null;
-                    
-                    // Access its shadow DOM
-                    const browser = browsers.shadowRoot;
-                    if (!browser) return null;
-
-                    // Find the preview component
-                    const preview = browser.querySelector('arcgis-item-browser-preview');
-                    if (!preview) return null;
-                    
-                    // Access its shadow DOM
-                    const shadow1 = preview.shadowRoot;
-                    if (!shadow1) return null;
-                    
-                    // Navigate to the calcite-flow component
-                    const calciteFlow = shadow1.querySelector('calcite-flow');
-                    if (!calciteFlow) return null;
-                    
-                    // Find the first flow item
-                    const flowItem = calciteFlow.querySelector('calcite-flow-item');
-                    if (!flowItem) return null;
-                    
-                    // Navigate to the accordion
-                    const accordion = flowItem.querySelector('calcite-accordion');
-                    if (!accordion) return null;
-                    
-                    // Find the specific accordion item (the second one)
-                    const accordionItem = accordion.querySelector('calcite-accordion-item:nth-of-type(2)');
-                    if (!accordionItem) return null;
-                    
-                    // Find the share summary component
-                    const shareSummary = accordionItem.querySelector('arcgis-item-share-summary');
-                    if (!shareSummary) return null;
-                    
-                    // Access its shadow DOM
-                    const shadow2 = shareSummary.shadowRoot;
-                    if (!shadow2) return null;
-                    
-                    // Finally, find the text span
-                    const locationSpan = shadow2.querySelector('div span.text');
-                    const result = locationSpan ? locationSpan.textContent.trim() : null;
-                    // Return "Public" if the result is "Everyone (public)"
-                    return result === "Everyone (public)" ? "Public" : result;               
-                """
-            }
-
-            # Extract data
-            data = {}
-            for field, script in scripts.items():
+            # Extract every field in a single WebDriver round trip per poll
+            try:
+                values = self._wait(
+                    preview_item_changed(read_preview, previous_id, ROW_FIELDS, expected_id),
+                    'preview', escalate=False,
+                )
+            except TimeoutException:
+                logger.warning("Preview panel did not fully render before timeout")
                 try:
-                    value = self._get_element_text_through_shadow(script)
-                    if value:
-                        data[field] = value
-                        logger.info(f"Found {field}: {value}")
-                    else:
-                        logger.error(f"No value found for {field}")
-                        data[field] = None
+                    values = read_preview(self.driver) or {}
                 except Exception as e:
-                    logger.error(f"Error extracting {field}: {e}")
+                    logger.error(f"Error reading the Preview panel: {e}")
+                    values = {}
+                # An item that lacks a field never renders it; only a panel that did not
+                # switch items at all suggests the portal is slow
+                shown = values.get('ID')
+                if not shown or (shown == previous_id and shown != expected_id):
+                    self.wait_timeouts.timed_out('preview')
+
+            if expected_id:
+                if values.get('ID') != expected_id:
+                    logger.error(f"Preview panel shows {values.get('ID')} instead of item {expected_id}")
+                    self.metrics.error('extract_row')
+                    return None
+            elif previous_id and values.get('ID') == previous_id:
+                logger.error(f"Preview panel still shows the previous item {previous_id}")
+                self.metrics.error('extract_row')
+                return None
+
+            data = {}
+            for field in ROW_FIELDS:
+                value = values.get(field)
+                value = value.strip() if isinstance(value, str) else None
+                if value:
+                    data[field] = value
+                    logger.info(f"Found {field}: {value}")
+                else:
+                    logger.error(f"No value found for {field}")
+                    self.metrics.error(f"missing_{field}")
                     data[field] = None
 
             # Create row data array
@@ -555,38 +549,568 @@ class AGOLScraper:
 
         except Exception as e:
             logger.error(f"Error in data extraction: {e}")
+            self.metrics.error('extract_row')
             self.driver.save_screenshot(f"extraction_error_{time.time()}.png")
             return None
 
-    def run(self, username: str, password: str):
-        """Main method to run the scraper."""
+    @timed('rest_search')
+    def _scrape_rest_search(self, watermark=None):
+        """Write every org item using the portal's REST search instead of the UI.
+
+        Results are sorted newest first, so with a ``watermark`` the search
+        stops at the first item last updated before it.
+        """
+        token = self.token or token_from_driver(self.driver, PORTAL_URL)
+        client = ArcGISRestClient(PORTAL_URL, token)
         try:
-            self._setup_webdriver()
+            rows = client.iter_rows()
+            if watermark:
+                rows = itertools.takewhile(
+                    lambda row: not self._older_than(row, watermark), rows
+                )
+            self._save_rows(rows)
+        finally:
+            client.close()
+
+    @timed('network_capture')
+    def _scrape_network_capture(self, start_page: int = 1, end_page=None, watermark=None):
+        """Write the items the Org table's own search requests return while paging through it.
+
+        Only the pagination is clicked; rows come from the captured JSON
+        responses, or from the table of a page whose response Chrome no
+        longer holds. Returns the number of pages visited.
+        """
+        if not self.capture:
+            raise RuntimeError("The browser was not started with network capture")
+        self.capture.reset()
+        visited = 0
+        for page, row_count in self._iter_pages(start_page, end_page):
+            oldest = self._save_rows(self._captured_rows(page, row_count))
+            visited += 1
+            if watermark and oldest and oldest < watermark:
+                logger.info(f"Page {page} reached items older than the last sync, stopping")
+                break
+        return visited
+
+    def _captured_rows(self, page: int, row_count: int):
+        """Rows from the current page's captured requests, or from its table if a response was lost."""
+        rows = self.capture.poll()
+        logger.info(f"Captured {len(rows)} items from page {page}'s requests")
+        if not self.capture.missed:
+            return rows
+        logger.warning(f"Lost {self.capture.missed} responses on page {page}, reading its table instead")
+        self.metrics.retry('network_fallback')
+        captured = {row[1] for row in rows}
+        return itertools.chain(
+            rows, (row for row in self._iter_page_rows(row_count) if row[1] not in captured)
+        )
+
+    @staticmethod
+    def _page_number(state):
+        return (state['startItem'] - 1) // state['pageSize'] + 1
+
+    @timed('page_transition')
+    def _go_to_page(self, page: int, state):
+        """Click through the pagination until ``page`` is showing. Returns its state.
+
+        Pages more than two away are first jumped to directly, so resuming
+        deep into a large org does not step through every page before it.
+        """
+        page_count = math.ceil(state['total'] / state['pageSize'])
+        if self._jump_pages and abs(page - self._page_number(state)) > 2:
+            state = self._jump_to_page(page, state)
+        for _ in range(page_count):
+            if self._page_number(state) == page:
+                return state
+            result = self.driver.execute_script(GO_TO_PAGE_SCRIPT, page)
+            logger.info(f"Pagination: {result}")
+            state = self._wait(page_loaded(state), 'page')
+        if self._page_number(state) != page:
+            raise RuntimeError(f"Could not navigate to page {page}")
+        return state
+
+    def _jump_to_page(self, page: int, state):
+        """Show ``page`` by setting the pagination's start item. Returns the new state.
+
+        If the item browser ignores the change, the pagination is put back,
+        jumps are turned off for this scraper and ``state`` is returned.
+        """
+        start_item = (page - 1) * state['pageSize'] + 1
+        if not self.driver.execute_script(JUMP_TO_PAGE_SCRIPT, start_item, True):
+            return state
+        try:
+            state = self._wait(page_loaded(state), 'page')
+            logger.info(f"Jumped to page {page}")
+            return state
+        except TimeoutException:
+            logger.warning("Item browser ignored a direct page jump, stepping through pages instead")
+            self.driver.execute_script(JUMP_TO_PAGE_SCRIPT, state['startItem'], False)
+            self._jump_pages = False
+            return state
+
+    def _heap_size(self):
+        """Bytes of JS heap in use by the page, or None if the browser cannot tell."""
+        try:
+            return self.driver.execute_cdp_cmd('Runtime.getHeapUsage', {})['usedSize']
+        except Exception:
+            pass
+        try:
+            return self.driver.execute_script(HEAP_SCRIPT)
+        except Exception:
+            return None
+
+    def _check_heap(self, page: int, state):
+        """Reload the Org page once the JS heap passes ``heap_limit``, restarting the browser if that is not enough.
+
+        Call between pages. Returns the state to navigate on from: ``state``
+        if nothing was done, otherwise the freshly loaded first page.
+        """
+        if not self.heap_limit:
+            return state
+        used = self._heap_size()
+        if used is None or used < self.heap_limit:
+            return state
+        logger.info(f"JS heap at {used / 2 ** 20:.0f} MB after page {page}, reloading the Org page")
+        self.metrics.retry('heap_reload')
+        self._reload_content()
+        used = self._heap_size()
+        if used is not None and used >= self.heap_limit:
+            logger.info(f"JS heap still at {used / 2 ** 20:.0f} MB, restarting the browser")
+            self.metrics.retry('heap_recycle')
+            self._recycle_browser()
+        self._last_item_id = None
+        return self._wait(page_loaded(), 'navigation')
+
+    def _recycle_browser(self):
+        """Replace the browser with a new one on the Org page, logged in with the same cookies."""
+        cookies = self.driver.get_cookies()
+        capture = self.capture
+        self._quit_driver()
+        self._setup_webdriver(capture_network=capture is not None)
+        if capture:
+            # Keep the IDs already captured so nothing is returned twice
+            capture.driver = self.driver
+            self.capture = capture
+        self._open_with_cookies(cookies)
+
+    def _page_range(self, start_page: int = 1, end_page=None):
+        """Return the current page state and the pages to scrape, clamped to the last page."""
+        state = self._wait(page_loaded(), 'navigation')
+        last_page = max(1, math.ceil(state['total'] / state['pageSize']))
+        end_page = min(end_page or last_page, last_page)
+        logger.info(
+            f"Org has {state['total']} items on {last_page} pages of {state['pageSize']}; "
+            f"scraping pages {start_page}-{end_page}"
+        )
+        return state, range(start_page, end_page + 1)
+
+    def _iter_pages(self, start_page: int = 1, end_page=None):
+        """Visit each page from start_page to end_page (default: the last page).
+
+        Yields the page number and the number of rows rendered on it.
+        """
+        state, pages = self._page_range(start_page, end_page)
+        for page in pages:
+            state = self._go_to_page(page, state)
+            yield page, state['rendered']
+            # The consumer has finished with the page, so the browser can be reloaded safely
+            state = self._check_heap(page, state)
+
+    def _iter_page_rows(self, row_count: int, page=None, below_row=None):
+        """Yield the extracted row of every item on the current page, last row first.
+
+        ``below_row`` resumes a half-done page with the rows under that index.
+        With a ``page`` each row's position is tracked in the checkpoint, which
+        advances once the writer has saved the row, and rows with missing
+        fields are held back for _retry_incomplete. A held-back row is tracked
+        under its (page, row) key, so the checkpoint waits for it too.
+        """
+        first = row_count if below_row is None else min(below_row, row_count)
+        table_rows = self._extract_table_rows() if self.table_extraction else []
+        for i in range(first - 1, -1, -1):
+            logger.info(f"Processing row {i}")
+            row_data = table_rows[i] if i < len(table_rows) else None
+            if row_data is None or None in row_data:
+                if self.table_extraction:
+                    self.metrics.retry('preview_fallback')
+                row_data = self._extract_preview_row(i, row_data)
+
+            if page is not None and (not row_data or None in row_data):
+                logger.warning(f"Row {i} of page {page} is incomplete, will retry at the end")
+                self._incomplete[(page, i)] = row_data
+                if self.checkpoint:
+                    self.checkpoint.track(page, i, (page, i))
+                continue
+            if self.checkpoint and page is not None:
+                self.checkpoint.track(page, i, row_data[1] if row_data else None)
+            if row_data:
+                yield row_data
+
+    @timed('extract_table')
+    def _extract_table_rows(self):
+        """Read every row of the current page from the table in one script call."""
+        try:
+            values = call_helper(self.driver, 'tableRows') or []
+        except Exception as e:
+            logger.error(f"Error reading the table rows: {e}")
+            self.metrics.error('extract_table')
+            return []
+        rows = [
+            [row.get('title'), row.get('ID'), row.get('type'),
+             row.get('Owner'), row.get('Sharing'), row.get('last_updated')]
+            for row in values
+        ]
+        complete = sum(1 for row in rows if None not in row)
+        logger.info(f"Table extraction read {complete} of {len(rows)} rows completely")
+        return rows
+
+    def _extract_preview_row(self, index: int, partial=None, expected_id=None):
+        """Open row ``index`` in the Preview panel and extract it.
+
+        Fields the panel does not yield are taken from ``partial``, a row
+        already read from the table, when one is given. With ``expected_id``
+        the panel must show that item, even if it is the one last opened.
+        """
+        self._click_preview_button(index)
+        row_data = self._extract_row_data(self._last_item_id, expected_id)
+        if not row_data:
+            return partial
+        self._last_item_id = row_data[1]
+        if partial:
+            row_data = [value or fallback for value, fallback in zip(row_data, partial)]
+        return row_data
+
+    def _retry_incomplete(self):
+        """Re-extract the rows held back as incomplete, then write them however they turn out."""
+        with self.metrics.span('retry_incomplete'):
+            self._save_rows(self._iter_incomplete())
+
+    def _iter_incomplete(self):
+        """Re-extract the rows held back as incomplete and yield them, complete or not.
+
+        A row whose position now shows a different item keeps the values
+        from its first pass, as do all remaining rows if the pass fails.
+        """
+        if not self._incomplete:
+            return
+        pending, self._incomplete = sorted(self._incomplete.items()), {}
+        logger.info(f"Retrying {len(pending)} incomplete rows")
+        state = None
+        completed = 0
+        for (page, index), partial in pending:
+            row_data = None
+            if state is not False:
+                try:
+                    self.metrics.retry('incomplete_row')
+                    state = self._go_to_page(page, state or self._wait(page_loaded(), 'navigation'))
+                    # Row 0 of the last page is often still open in the panel
+                    row_data = self._extract_preview_row(index, expected_id=partial and partial[1])
+                except Exception as e:
+                    logger.error(f"Retry pass failed, writing rows as first extracted: {e}")
+                    state = False
+            if row_data and partial:
+                row_data = [value or fallback for value, fallback in zip(row_data, partial)]
+            row_data = row_data or partial
+            if self.checkpoint:
+                self.checkpoint.resolve((page, index), row_data[1] if row_data else None)
+            if row_data:
+                completed += None not in row_data
+                yield row_data
+        logger.info(f"{completed} of {len(pending)} retried rows are now complete")
+
+    def _load_sheet_rows(self):
+        """Map each item ID already in the sheet to its row number (one API call)."""
+        if self.sheet is None:
+            return
+        try:
+            ids = self.sheet.col_values(2)
+        except Exception as e:
+            logger.warning(f"Could not read sheet IDs, changed items will be appended: {e}")
+            return
+        self._sheet_rows = {item_id: number for number, item_id in enumerate(ids, 1) if item_id}
+        logger.info(f"Sheet already has {len(self._sheet_rows)} items")
+
+    def _should_write(self, row_data):
+        """Whether a row is new or changed since it was last written."""
+        item_id = row_data[1]
+        if not self.state or not item_id:
+            return True
+        if item_id in self._seen_ids:
+            return False
+        self._seen_ids.add(item_id)
+        status = self.state.classify(row_data)
+        if status == 'unchanged':
+            logger.info(f"Skipping unchanged item {item_id}")
+            return False
+        logger.info(f"Item {item_id} is {status}")
+        return True
+
+    def _enricher(self):
+        """The item enricher, created on first use with the current portal token."""
+        if not self.token:
+            self.token = token_from_driver(self.driver, PORTAL_URL)
+        if self.enricher is None:
+            cache = EnrichmentCache(self.enrich_cache_path) if self.enrich_cache_path else None
+            self.enricher = ItemEnricher(PORTAL_URL, self.token, self.enrich_concurrency, cache)
+        # The daemon refreshes the token between syncs
+        self.enricher.token = self.token
+        return self.enricher
+
+    @staticmethod
+    def _older_than(row_data, watermark):
+        updated = parse_last_updated(row_data[5])
+        return updated is not None and updated < watermark
+
+    def _save_rows(self, rows):
+        """Write new or changed rows, updating sheet rows in place where the item exists.
+
+        Returns the oldest last_updated date among the rows.
+        """
+        oldest = None
+
+        def new_or_changed():
+            nonlocal oldest
+            for row_data in rows:
+                updated = parse_last_updated(row_data[5])
+                if updated and (oldest is None or updated < oldest):
+                    oldest = updated
+                if self._should_write(row_data):
+                    yield row_data
+                elif self.checkpoint:
+                    self.checkpoint.skipped(row_data[1])
+
+        pending = new_or_changed()
+        if self.enrich:
+            pending = self._enricher().enrich_stream(pending)
+        for row_data in pending:
+            try:
+                sheet_row = self._sheet_rows.get(row_data[1])
+                if sheet_row:
+                    self.writer.update(sheet_row, row_data)
+                else:
+                    self.writer.append(row_data)
+            except Exception as e:
+                logger.error(f"Failed to save row {row_data[1]}: {e}")
+                # Not retried this run; the state store still has it as new or changed
+                if self.checkpoint:
+                    self.checkpoint.skipped(row_data[1])
+        return oldest
+
+    def _save_screenshot(self, filename: str):
+        try:
+            self.driver.save_screenshot(filename)
+        except Exception as e:
+            logger.warning(f"Could not save screenshot {filename}: {e}")
+
+    def _quit_driver(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                logger.warning(f"Error quitting webdriver: {e}")
+            self.driver = None
+
+    def _write_run_report(self):
+        """Write the run's phase timings as JSON and Prometheus text files."""
+        if not self.report_path:
+            return
+        try:
+            self.metrics.write_json(f"{self.report_path}.json")
+            self.metrics.write_prometheus(f"{self.report_path}.prom")
+            logger.info(f"Wrote run report to {self.report_path}.json and .prom")
+        except OSError as e:
+            logger.warning(f"Could not write run report: {e}")
+
+    def _start_session(self, username: str, password: str, capture_network: bool = False):
+        """Start a browser on the Org content page, reusing the cached login if it is still valid."""
+        self._setup_webdriver(capture_network=capture_network)
+        if not self._restore_session():
             self._login(username, password)
-            time.sleep(35)
-            for i in range(59, -1, -1):
-                self._click_preview_button(i)
-                # Wait for content to load
-                time.sleep(5)
-                
-                # Extract data from the first row
-                logger.info("Processing first row")
-                row_data = self._extract_row_data()
-                
-                if row_data:
-                    logger.info("Attempting to save to Google Sheets")
-                    try:
-                        self.sheet.append_row(row_data)
-                        logger.info("Successfully saved to Google Sheets")
-                    except Exception as e:
-                        logger.error(f"Failed to save to Google Sheets: {e}")
-            
+            self._save_session()
+
+    def _reload_content(self):
+        """Reload the Org content page so the table shows the current items."""
+        self.driver.get(f"{PORTAL_URL}/home/index.html")
+        self._navigate_to_content()
+
+    def _scrape(self, username: str, password: str, backend: str, start_page: int,
+                end_page, workers: int, watermark):
+        """Start a browser, log in and scrape, resuming from the checkpoint if there is one."""
+        self._start_session(username, password, capture_network=backend == 'network')
+        return self._sync(backend, start_page, end_page, workers, watermark)
+
+    def _track_page(self, page: int, rows):
+        """Yield a worker's finished page, checkpointing the page once all its rows are saved.
+
+        That includes the rows the worker held back, which are saved at the end of the run.
+        """
+        for row in rows:
+            if self.checkpoint:
+                self.checkpoint.track(page, None, row[1])
+            yield row
+        if self.checkpoint:
+            for key in [key for key in list(self._incomplete) if key[0] == page]:
+                self.checkpoint.track(page, None, key)
+            self.checkpoint.track(page, 0)
+
+    def _sync(self, backend: str, start_page: int, end_page, workers: int, watermark):
+        """Scrape from a logged-in browser showing the Org content page.
+
+        Returns the number of pages saved.
+        """
+        self._seen_ids = set()
+        if backend == 'rest':
+            self._scrape_rest_search(watermark)
+            return 0
+        if backend == 'network':
+            return self._scrape_network_capture(start_page, end_page, watermark)
+
+        below_row = None
+        if self.checkpoint:
+            start_page, below_row = self.checkpoint.resume_point(start_page)
+            if end_page and start_page > end_page:
+                logger.info("Checkpoint shows every requested page is done")
+                return 0
+        if workers > 1:
+            _, pages = self._page_range(start_page, end_page)
+            page_rows = (
+                (page, self._track_page(page, rows))
+                for page, rows in WorkerPool(self, workers).run(pages)
+            )
+        else:
+            page_rows = (
+                (page, self._iter_page_rows(
+                    row_count, page, below_row if page == start_page else None
+                ))
+                for page, row_count in self._iter_pages(start_page, end_page)
+            )
+        saved = 0
+        for page, rows in page_rows:
+            logger.info(f"Saving page {page}")
+            oldest = self._save_rows(rows)
+            saved += 1
+            if watermark and oldest and oldest < watermark:
+                logger.info(f"Page {page} reached items older than the last sync, stopping")
+                break
+        self._retry_incomplete()
+        return saved
+
+    def iter_items(self, username: str, password: str, backend: str = 'browser',
+                   start_page: int = 1, end_page=None):
+        """Log in and yield inventory rows one at a time, without writing them anywhere.
+
+        Rows are read lazily as the caller consumes them, so memory stays flat
+        however large the org is. ``backend``, ``start_page`` and ``end_page``
+        are as for run(). A browser scrape resumes from the checkpoint and
+        clears it once every row has been yielded. The browser is closed when
+        the generator finishes or is closed.
+        """
+        try:
+            self._start_session(username, password, capture_network=backend == 'network')
+            if backend == 'rest':
+                client = ArcGISRestClient(PORTAL_URL, self.token or token_from_driver(self.driver, PORTAL_URL))
+                try:
+                    yield from client.iter_rows()
+                finally:
+                    client.close()
+                return
+            if backend == 'network':
+                if not self.capture:
+                    raise RuntimeError("The browser was not started with network capture")
+                self.capture.reset()
+                for page, row_count in self._iter_pages(start_page, end_page):
+                    yield from self._captured_rows(page, row_count)
+                return
+
+            below_row = None
+            if self.checkpoint:
+                start_page, below_row = self.checkpoint.resume_point(start_page)
+            for page, row_count in self._iter_pages(start_page, end_page):
+                for row in self._iter_page_rows(row_count, page, below_row if page == start_page else None):
+                    yield row
+                    # The caller has finished with the row once it asks for the next one
+                    if self.checkpoint:
+                        self.checkpoint.written([row])
+            for row in self._iter_incomplete():
+                yield row
+                if self.checkpoint:
+                    self.checkpoint.written([row])
+            if self.checkpoint:
+                self.checkpoint.clear()
+        finally:
+            self._quit_driver()
+            self._last_item_id = None
+
+    def run(self, username: str, password: str, backend: str = 'browser',
+            start_page: int = 1, end_page=None, workers: int = 1,
+            since_last_sync: bool = False, max_restarts: int = 3):
+        """Main method to run the scraper.
+
+        ``backend`` is 'browser' to read each item's Preview panel, 'rest'
+        to fetch the whole org from the REST search endpoint after login, or
+        'network' to page through the Org table and read the items from the
+        search responses the page itself receives.
+        The browser backend scrapes pages ``start_page`` to ``end_page``
+        (1-based, inclusive; default every page), spread over ``workers``
+        headless browsers when more than one is requested.
+
+        With ``since_last_sync`` paging stops once a page reaches items last
+        updated before the previous sync; this assumes the Org view is sorted
+        by modified date, newest first.
+
+        If the browser crashes the driver is restarted, up to ``max_restarts``
+        times, and scraping resumes after the last checkpointed row. A wait
+        that times out, such as a login step or a page that never loads,
+        ends the run instead; the checkpoint is kept for the next one.
+        """
+        try:
+            watermark = None
+            if self.state:
+                self._load_sheet_rows()
+                if since_last_sync:
+                    watermark = self.state.watermark()
+                    logger.info(f"Syncing items updated since {watermark}")
+
+            for attempt in range(max_restarts + 1):
+                try:
+                    self._scrape(username, password, backend, start_page, end_page,
+                                 workers, watermark)
+                    break
+                except TimeoutException:
+                    # Not a crash: a login page that changed would time out again, and
+                    # every attempt could send another Duo push
+                    raise
+                except WebDriverException as e:
+                    if attempt == max_restarts:
+                        raise
+                    logger.error(f"Browser failed, restarting ({attempt + 1}/{max_restarts}): {e}")
+                    self.metrics.retry('browser_restart')
+                    self._save_screenshot(f"restart_{attempt + 1}.png")
+                    self._quit_driver()
+                    self._last_item_id = None
+                    # Settle the checkpoint so the restart resumes after the rows already saved
+                    self._abandon_pending_rows()
+
+            # Only a run whose rows were all saved forgets its position
+            self.writer.flush()
+            if self.checkpoint:
+                self.checkpoint.clear()
+
         except Exception as e:
             logger.error(f"Scraper failed: {e}")
-            self.driver.save_screenshot("error.png")
+            self.metrics.error('run')
+            self._save_screenshot("error.png")
         finally:
-            if self.driver:
-                self.driver.quit()
+            try:
+                # Closing also finishes file outputs, e.g. a Parquet file's footer
+                self.writer.close()
+            except Exception as e:
+                logger.error(f"Failed to flush {len(self.writer)} rows: {e}")
+            if self.enricher:
+                self.enricher.close()
+            self._quit_driver()
+            self._write_run_report()
+            self.wait_timeouts.save()
 
 if __name__ == "__main__":
     scraper = AGOLScraper(
@@ -0,0 +1,118 @@
+"""Adaptive rate control for quota-limited APIs such as Google Sheets.
+
+RateController spaces calls with a token bucket and learns the rate the
+quota allows: every success raises the rate a little, and every quota error
+halves it and backs off exponentially with jitter before retrying.
+"""
+import time
+import random
+import logging
+import threading
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: quota exhausted and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def is_retryable(error):
+    """Whether an API error is a quota or transient server error."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    message = str(error)
+    return '429' in message or 'RESOURCE_EXHAUSTED' in message or 'Quota exceeded' in message
+
+
+def is_quota_error(error):
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    if status is not None:
+        return status == 429
+    return is_retryable(error)
+
+
+class RateController:
+    """Token bucket whose rate adapts to quota errors (additive increase, multiplicative decrease).
+
+    ``rate`` is the starting number of calls per second, kept between
+    ``min_rate`` and ``max_rate``; ``burst`` calls may go out back to back.
+    A failed call is retried up to ``max_attempts`` times, waiting a random
+    time of up to ``base_delay * 2 ** attempt`` seconds, capped at
+    ``max_delay``. Thread-safe.
+    """
+
+    def __init__(self, rate: float = 1.0, min_rate: float = 0.05, max_rate: float = 10.0,
+                 burst: int = 1, increase: float = 0.05, base_delay: float = 1.0,
+                 max_delay: float = 64.0, max_attempts: int = 6, metrics=None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.metrics = metrics
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call is allowed at the current rate."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+                self._refilled = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Drop saved-up tokens so the next call waits for the lower rate
+            self._tokens = min(self._tokens, 0.0)
+        logger.warning(f"Quota error, write rate lowered to {self.rate:.2f}/s")
+
+    def backoff(self, attempt: int):
+        """Seconds to wait before retry ``attempt`` (1-based): full jitter, exponential cap."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _span(self, phase: str):
+        return self.metrics.span(phase) if self.metrics is not None else nullcontext()
+
+    def call(self, method, *args):
+        """Call ``method`` at the controlled rate, retrying quota and transient errors.
+
+        With ``metrics``, time spent waiting for the rate is timed as the
+        'write_pacing' phase and sleeps before a retry as 'write_backoff'.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            with self._span('write_pacing'):
+                self.acquire()
+            try:
+                result = method(*args)
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_attempts:
+                    raise
+                if is_quota_error(e):
+                    self.throttled()
+                delay = self.backoff(attempt)
+                logger.warning(f"Write failed ({e}), retry {attempt} in {delay:.1f} s")
+                if self.metrics is not None:
+                    self.metrics.retry('write_backoff')
+                with self._span('write_backoff'):
+                    time.sleep(delay)
+                continue
+            self.succeeded()
+            return result
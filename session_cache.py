@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import logging
+from urllib.parse import unquote
+
+logger = logging.getLogger(__name__)
+
+# Cookies set by the portal's sign-in that carry the authenticated session
+AUTH_COOKIES = ('esri_aopc', 'esri_auth')
+
+
+def portal_cookies(cookies, domain: str = 'arcgis.com'):
+    """Return the cookies that belong to ``domain`` or one of its subdomains."""
+    return [c for c in cookies if c.get('domain', '').lstrip('.').endswith(domain)]
+
+
+def token_expiry(cookies):
+    """Unix time the token in the ``esri_auth`` cookie expires, or None if it does not say."""
+    for cookie in cookies:
+        if cookie.get('name') == 'esri_auth':
+            try:
+                expires = json.loads(unquote(cookie['value'])).get('expires')
+            except (ValueError, AttributeError):
+                return None
+            # Milliseconds, like other ArcGIS timestamps
+            return expires / 1000 if expires else None
+    return None
+
+
+def add_cookies(driver, cookies):
+    """Add ``cookies`` to ``driver``, which must already be on their domain."""
+    restored = 0
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except Exception as e:
+            logger.warning(f"Could not restore cookie {cookie.get('name')}: {e}")
+    return restored
+
+
+class SessionCache:
+    """Persist portal cookies and token between runs so login can be skipped.
+
+    Only cookies for ``cookie_domain`` are stored, since those are the ones
+    that can be restored on the portal page. A saved session is considered
+    stale after ``max_age`` seconds, when an auth cookie expires or when the
+    token in ``esri_auth`` expires, whichever comes first.
+    """
+
+    def __init__(self, path: str = 'agol_session.json', max_age: float = 2 * 60 * 60,
+                 cookie_domain: str = 'arcgis.com'):
+        self.path = path
+        self.max_age = max_age
+        self.cookie_domain = cookie_domain
+
+    def save(self, driver, token=None, keep_expiry: bool = False):
+        """Write the driver's portal cookies and ``token`` to disk.
+
+        With ``keep_expiry`` a session already cached keeps its original
+        save time and expiry, so re-saving the same login does not extend it.
+        """
+        now = time.time()
+        cookies = portal_cookies(driver.get_cookies(), self.cookie_domain)
+        saved_at = now
+        expires_at = now + self.max_age
+        previous = self._read() if keep_expiry else None
+        if previous and 'expires_at' in previous:
+            saved_at = previous.get('saved_at', now)
+            expires_at = min(expires_at, previous['expires_at'])
+        for cookie in cookies:
+            if cookie['name'] in AUTH_COOKIES and cookie.get('expiry'):
+                expires_at = min(expires_at, cookie['expiry'])
+        token_expires_at = token_expiry(cookies)
+        if token_expires_at:
+            expires_at = min(expires_at, token_expires_at)
+
+        # Created with owner-only permissions since the file holds live credentials
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({
+                'saved_at': saved_at,
+                'expires_at': expires_at,
+                'token': token,
+                'cookies': cookies,
+            }, f)
+        logger.info(f"Saved session with {len(cookies)} cookies, valid for {expires_at - now:.0f} seconds")
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable session cache: {e}")
+            return None
+
+    def expires_at(self):
+        """When the saved session expires, even if that has already passed; None without one."""
+        session = self._read()
+        return session.get('expires_at') if session else None
+
+    def load(self):
+        """Return the saved session dict, or None if it is missing or expired."""
+        session = self._read()
+        if session is None:
+            return None
+        if session.get('expires_at', 0) <= time.time():
+            logger.info("Cached session has expired")
+            return None
+        return session
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
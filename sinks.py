@@ -0,0 +1,468 @@
+import csv
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class InMemoryWorksheet:
+    """Offline stand-in for a gspread worksheet.
+
+    Implements the subset of the worksheet API the scraper writes through and
+    counts calls, so flush behaviour can be checked without the Sheets API.
+    """
+
+    def __init__(self, title: str = "Sheet1"):
+        self.title = title
+        self.rows = []
+        self.calls = 0
+
+    def append_row(self, values, value_input_option: str = "RAW"):
+        self.calls += 1
+        self.rows.append(list(values))
+
+    def append_rows(self, values, value_input_option: str = "RAW"):
+        self.calls += 1
+        self.rows.extend(list(row) for row in values)
+
+    def col_values(self, col: int):
+        self.calls += 1
+        return [row[col - 1] if len(row) >= col else '' for row in self.rows]
+
+    def batch_update(self, data, value_input_option: str = "RAW"):
+        """Apply updates whose ranges are single rows in A1 notation, e.g. 'A5:F5'."""
+        self.calls += 1
+        for update in data:
+            start = update['range'].split(':')[0]
+            row_number = int(start.lstrip('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+            while len(self.rows) < row_number:
+                self.rows.append([])
+            self.rows[row_number - 1] = list(update['values'][0])
+
+
+# Column order of an inventory row
+ROW_COLUMNS = ('title', 'id', 'type', 'owner', 'sharing', 'last_updated')
+# Columns holding whole numbers; every other column is text
+INTEGER_COLUMNS = ('size', 'views')
+
+
+def row_range(row_number: int, width: int):
+    """A1 range covering columns A.. of one sheet row, e.g. 'A5:F5'."""
+    return f"A{row_number}:{chr(ord('A') + width - 1)}{row_number}"
+
+
+class BufferedSink:
+    """Base class for outputs that write inventory rows in batches.
+
+    New rows are buffered with append and replacements for an existing row
+    with update. The buffer is flushed once it holds ``batch_size`` rows or
+    the oldest buffered row is ``flush_interval`` seconds old, so memory
+    stays constant however many rows pass through. Rows stay buffered if a
+    flush fails, so the next flush retries them. ``on_flush`` is called
+    with every row written by a successful flush, and writes are timed as
+    the sink's ``phase`` when ``metrics`` (a RunMetrics) is given.
+
+    Subclasses implement write_rows and may override write_updates and close.
+    """
+
+    phase = 'sink_write'
+    # Names of the row's columns, for outputs with a header or schema
+    columns = ROW_COLUMNS
+    # Optional rate_limit.RateController pacing and retrying every write
+    rate_limit = None
+
+    def __init__(self, batch_size: int = 100, flush_interval: float = 60.0,
+                 on_flush=None, metrics=None):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.metrics = metrics
+        self._appends = []
+        self._updates = {}
+        self._oldest = None
+
+    def __len__(self):
+        return len(self._appends) + len(self._updates)
+
+    def append(self, row):
+        """Buffer one new row, flushing if a threshold has been reached."""
+        self._buffered()
+        self._appends.append(list(row))
+        if self._should_flush():
+            self.flush()
+
+    def update(self, row_number: int, row):
+        """Buffer a replacement for the existing row ``row_number`` (1-based)."""
+        self._buffered()
+        self._updates[row_number] = list(row)
+        if self._should_flush():
+            self.flush()
+
+    def flush_if_due(self):
+        """Flush if the buffered rows have reached a size or age threshold."""
+        if len(self) and self._should_flush():
+            self.flush()
+
+    def _buffered(self):
+        if not len(self):
+            self._oldest = time.monotonic()
+
+    def _should_flush(self):
+        if len(self) >= self.batch_size:
+            return True
+        return time.monotonic() - self._oldest >= self.flush_interval
+
+    def flush(self):
+        """Write all buffered rows, one call per kind of write. Returns the row count."""
+        if not len(self):
+            return 0
+        count = 0
+        if self._updates:
+            self.timed_call(self.write_updates, self._updates)
+            count += self._written(list(self._updates.values()))
+            self._updates = {}
+        if self._appends:
+            self.timed_call(self.write_rows, self._appends)
+            count += self._written(self._appends)
+            self._appends = []
+        self._oldest = None
+        return count
+
+    def close(self):
+        """Flush and release any open files. The sink can be written to again afterwards."""
+        self.flush()
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def write_updates(self, updates):
+        """Write {row_number: row} replacements. Append-only outputs add them as new rows."""
+        self.write_rows(list(updates.values()))
+
+    def timed_call(self, method, payload):
+        """Call ``method(payload)`` through rate_limit, timing each attempt as ``phase``.
+
+        Waits for the rate limit and between retries are not part of the
+        phase; the RateController reports them as phases of their own.
+        """
+        call = method
+        if self.metrics is not None:
+            def call(payload):
+                with self.metrics.span(self.phase):
+                    return method(payload)
+        if self.rate_limit is not None:
+            return self.rate_limit.call(call, payload)
+        return call(payload)
+
+    def _written(self, rows):
+        if self.on_flush:
+            self.on_flush(rows)
+        return len(rows)
+
+
+class BufferedSheetWriter(BufferedSink):
+    """Write rows to a gspread worksheet.
+
+    New rows go out in one append_rows call per flush and replacements in
+    one batch_update call, paced by ``rate_limit`` when one is given.
+    """
+
+    phase = 'sheet_write'
+
+    def __init__(self, sheet, batch_size: int = 100, flush_interval: float = 60.0,
+                 on_flush=None, metrics=None, rate_limit=None):
+        super().__init__(batch_size, flush_interval, on_flush, metrics)
+        self.sheet = sheet
+        self.rate_limit = rate_limit
+
+    def write_rows(self, rows):
+        self.sheet.append_rows(rows)
+        logger.info(f"Appended {len(rows)} rows to Google Sheets")
+
+    def write_updates(self, updates):
+        self.sheet.batch_update([
+            {'range': row_range(number, len(row)), 'values': [row]}
+            for number, row in updates.items()
+        ])
+        logger.info(f"Updated {len(updates)} rows in Google Sheets")
+
+
+class CSVSink(BufferedSink):
+    """Append rows to a CSV file, writing a header row when the file is new.
+
+    The file is append-only, so an updated item is written as a new row; the
+    last row for an ID is the current one.
+    """
+
+    phase = 'csv_write'
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 10.0,
+                 on_flush=None, metrics=None):
+        super().__init__(batch_size, flush_interval, on_flush, metrics)
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def write_rows(self, rows):
+        if self._file is None:
+            self._file = open(self.path, 'a', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            if self._file.tell() == 0:
+                self._writer.writerow(self.columns)
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class JSONLSink(BufferedSink):
+    """Append rows to a JSON Lines file, one object per item keyed by column name.
+
+    Like CSVSink, updated items are appended and the last line for an ID wins.
+    """
+
+    phase = 'jsonl_write'
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 10.0,
+                 on_flush=None, metrics=None):
+        super().__init__(batch_size, flush_interval, on_flush, metrics)
+        self.path = path
+        self._file = None
+
+    def write_rows(self, rows):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.writelines(json.dumps(dict(zip(self.columns, row))) + '\n' for row in rows)
+        self._file.flush()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ParquetSink(BufferedSink):
+    """Write rows to a Parquet file, one row group per flush. Needs pyarrow.
+
+    Parquet files cannot be appended to, so each run writes a new file:
+    ``path`` may contain a ``{timestamp}`` placeholder, filled in when the
+    file is opened. The file is only complete once the sink is closed.
+    """
+
+    phase = 'parquet_write'
+
+    def __init__(self, path: str = 'agol_inventory_{timestamp}.parquet',
+                 row_group_size: int = 1000, flush_interval: float = 60.0,
+                 on_flush=None, metrics=None):
+        super().__init__(row_group_size, flush_interval, on_flush, metrics)
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("ParquetSink needs the pyarrow package") from e
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.schema = None
+        self._writer = None
+
+    def write_rows(self, rows):
+        if self._writer is None:
+            # Built on first write since the scraper may widen ``columns`` after construction
+            self.schema = self._pa.schema([
+                (name, self._pa.int64() if name in INTEGER_COLUMNS else self._pa.string())
+                for name in self.columns
+            ])
+            path = self.path.format(timestamp=time.strftime('%Y%m%d-%H%M%S'))
+            self._writer = self._pq.ParquetWriter(path, self.schema)
+            logger.info(f"Writing Parquet output to {path}")
+        columns = [
+            self._pa.array([row[i] for row in rows], type=field.type)
+            for i, field in enumerate(self.schema)
+        ]
+        self._writer.write_table(self._pa.Table.from_arrays(columns, schema=self.schema))
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+class MultiSink(BufferedSink):
+    """Write every row to several sinks at once.
+
+    Rows are buffered here and passed to each child's write methods on
+    flush. A child that fails keeps its batches in a backlog and retries
+    them on the next flush, so one unreachable output does not hold back
+    the others or duplicate rows in them. A backlog holds at most
+    ``max_backlog`` rows; beyond that its oldest batches are dropped.
+
+    The first sink is the primary one, normally the sheet: ``on_flush`` is
+    only called with rows once the primary sink has written them, so rows
+    it failed to write, or dropped, are not recorded as synced.
+    """
+
+    def __init__(self, sinks, batch_size: int = 100, flush_interval: float = 60.0,
+                 on_flush=None, metrics=None, max_backlog: int = 10000):
+        super().__init__(batch_size, flush_interval, on_flush, metrics)
+        self.sinks = list(sinks)
+        self.max_backlog = max_backlog
+        self._backlog = {id(sink): [] for sink in self.sinks}
+
+    def timed_call(self, method, payload):
+        # Each child paces and times its own writes in _drain
+        return method(payload)
+
+    def _written(self, rows):
+        # on_flush is called from _drain once the primary sink has the rows
+        return len(rows)
+
+    def write_rows(self, rows):
+        self._fan_out('write_rows', list(rows))
+
+    def write_updates(self, updates):
+        self._fan_out('write_updates', dict(updates))
+
+    def _fan_out(self, method_name, payload):
+        for sink in self.sinks:
+            backlog = self._backlog[id(sink)]
+            backlog.append((method_name, payload))
+            self._trim(sink, backlog)
+            self._drain(sink)
+
+    def _trim(self, sink, backlog):
+        """Drop the oldest batches of a backlog holding more than max_backlog rows."""
+        while len(backlog) > 1 and sum(len(batch) for _, batch in backlog) > self.max_backlog:
+            _, dropped = backlog.pop(0)
+            logger.error(f"{type(sink).__name__} backlog full, dropped {len(dropped)} rows")
+            if self.metrics is not None:
+                self.metrics.error('backlog_dropped')
+
+    def _drain(self, sink):
+        backlog = self._backlog[id(sink)]
+        while backlog:
+            name, batch = backlog[0]
+            try:
+                sink.timed_call(getattr(sink, name), batch)
+            except Exception as e:
+                logger.error(f"{type(sink).__name__} failed, {len(backlog)} batches kept for retry: {e}")
+                return
+            backlog.pop(0)
+            if sink is self.sinks[0] and self.on_flush:
+                self.on_flush(list(batch.values()) if isinstance(batch, dict) else batch)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for sink in self.sinks:
+                self._drain(sink)
+                pending = self._backlog[id(sink)]
+                if pending:
+                    logger.error(f"{type(sink).__name__} still has {len(pending)} unwritten batches")
+                try:
+                    sink.close()
+                except Exception as e:
+                    logger.error(f"Failed to close {type(sink).__name__}: {e}")
+
+
+class BackgroundWriter:
+    """Feed a BufferedSink from a background thread through a bounded queue.
+
+    append and update return as soon as the row is queued, so the browser
+    keeps extracting while the sink's write is in flight. When ``max_queue``
+    rows are waiting the caller blocks until the writer catches up, timed
+    as the 'write_backpressure' phase. flush blocks until every queued row
+    has been written and re-raises the flush error, if any.
+    """
+
+    def __init__(self, writer, max_queue: int = 500):
+        self.writer = writer
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._drain, name="sheet-writer", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        return self._queue.qsize() + len(self.writer)
+
+    def append(self, row):
+        self._put(('append', list(row)))
+
+    def update(self, row_number: int, row):
+        self._put(('update', (row_number, list(row))))
+
+    def _put(self, task):
+        # A closed writer starts a new thread on its next write
+        if not self._thread.is_alive():
+            self._start()
+        if self._queue.full() and self.writer.metrics is not None:
+            with self.writer.metrics.span('write_backpressure'):
+                self._queue.put(task)
+        else:
+            self._queue.put(task)
+
+    def flush(self):
+        """Write everything queued so far, waiting for the writer thread to finish it."""
+        done = threading.Event()
+        result = {}
+        self._put(('flush', (done, result)))
+        done.wait()
+        if 'error' in result:
+            raise result['error']
+        return result.get('count', 0)
+
+    def close(self):
+        """Flush, stop the writer thread and close the sink."""
+        try:
+            self.flush()
+        finally:
+            self._queue.put(('stop', None))
+            self._thread.join()
+            self.writer.close()
+
+    def _drain(self):
+        while True:
+            try:
+                kind, payload = self._queue.get(timeout=1)
+            except queue.Empty:
+                self._write(self.writer.flush_if_due)
+                continue
+            if kind == 'append':
+                self._write(self.writer.append, payload)
+            elif kind == 'update':
+                self._write(self.writer.update, *payload)
+            elif kind == 'flush':
+                done, result = payload
+                try:
+                    result['count'] = self.writer.flush()
+                except Exception as e:
+                    result['error'] = e
+                finally:
+                    done.set()
+            elif kind == 'stop':
+                return
+
+    def _write(self, method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            # The rows stay buffered in the writer and are retried on the next flush
+            logger.error(f"Failed to write rows: {e}")
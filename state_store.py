@@ -0,0 +1,133 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+from sinks import ROW_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Formats the Preview panel and REST backend use for last_updated
+DATE_FORMATS = (
+    '%b %d, %Y',
+    '%B %d, %Y',
+    '%b %d, %Y %I:%M %p',
+    '%B %d, %Y %I:%M %p',
+    '%m/%d/%Y',
+    '%Y-%m-%d',
+)
+
+
+def parse_last_updated(value):
+    """Parse a last_updated cell into a datetime, or None if it is not a known format."""
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def row_hash(row):
+    """Hash of the inventory columns of a row, used to detect changes.
+
+    Enrichment columns are left out, so enriching a row does not make it look changed.
+    """
+    return hashlib.sha1(json.dumps(list(row)[:len(ROW_COLUMNS)]).encode('utf-8')).hexdigest()
+
+
+class StateStore:
+    """Local SQLite record of every item already written to the sheet.
+
+    Items are keyed by ID with a hash of their columns, so a run can tell
+    new and changed items from ones the sheet already has. The store also
+    keeps a watermark: the newest last_updated date seen by previous runs.
+    Safe to share between the scraping thread and the sheet writer thread.
+    """
+
+    def __init__(self, path: str = 'agol_state.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.RLock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                type TEXT,
+                owner TEXT,
+                sharing TEXT,
+                last_updated TEXT,
+                content_hash TEXT NOT NULL,
+                synced_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def classify(self, row):
+        """Return 'new', 'changed' or 'unchanged' for an inventory row."""
+        with self._lock:
+            found = self.conn.execute(
+                "SELECT content_hash FROM items WHERE id = ?", (row[1],)
+            ).fetchone()
+        if found is None:
+            return 'new'
+        return 'unchanged' if found[0] == row_hash(row) else 'changed'
+
+    def record(self, rows):
+        """Store rows that have been written to the sheet and advance the watermark."""
+        now = time.time()
+        newest = None
+        with self._lock, self.conn:
+            for row in rows:
+                if not row[1]:
+                    continue
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO items "
+                    "(id, title, type, owner, sharing, last_updated, content_hash, synced_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (row[1], row[0], row[2], row[3], row[4], row[5], row_hash(row), now),
+                )
+                updated = parse_last_updated(row[5])
+                if updated and (newest is None or updated > newest):
+                    newest = updated
+            if newest is not None:
+                current = self.watermark()
+                if current is None or newest > current:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('watermark', ?)",
+                        (newest.isoformat(),),
+                    )
+
+    def rows(self):
+        """Every recorded item as an inventory row, in ROW_COLUMNS order."""
+        with self._lock:
+            return [list(row) for row in self.conn.execute(
+                "SELECT title, id, type, owner, sharing, last_updated FROM items"
+            )]
+
+    def watermark(self):
+        """Newest last_updated recorded so far, or None before the first sync."""
+        value = self.get_meta('watermark')
+        return datetime.fromisoformat(value) if value else None
+
+    def get_meta(self, key: str, default=None):
+        with self._lock:
+            found = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return found[0] if found else default
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
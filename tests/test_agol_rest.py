@@ -0,0 +1,151 @@
+"""ArcGISRestClient against a local stub of the portal's sharing REST API."""
+import json
+import threading
+import unittest
+from datetime import datetime, timezone, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from agol_rest import ArcGISRestClient, format_modified, item_to_row, token_is_valid
+
+TOKEN = 'stub-token'
+ORG_ID = 'stuborg'
+
+
+def stub_item(n):
+    return {
+        'id': f"{n:032x}", 'title': f"Item {n}", 'type': 'Web Map', 'owner': f"owner{n % 3}",
+        'access': ('public', 'org', 'shared', 'private')[n % 4],
+        'modified': int(datetime(2024, 6, 1, 12, tzinfo=timezone.utc).timestamp() * 1000),
+        'orgId': ORG_ID,
+    }
+
+
+class StubPortal(BaseHTTPRequestHandler):
+    """Serves portals/self, community/self and paged search for ``items`` org items.
+
+    ``total`` is the count search reports, which may exceed the items it pages through.
+    """
+
+    items = 250
+    total = None
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        type(self).requests.append((url.path, params))
+        if params.get('token') != TOKEN:
+            return self._json({'error': {'code': 498, 'message': 'Invalid token'}})
+        if url.path == '/sharing/rest/portals/self':
+            return self._json({'id': ORG_ID, 'name': 'Stub org'})
+        if url.path == '/sharing/rest/community/self':
+            return self._json({'username': 'stub'})
+        if url.path == '/sharing/rest/search':
+            if params.get('q') != f"orgid:{ORG_ID}":
+                return self._json({'error': {'code': 400, 'message': 'Unable to perform query'}})
+            start, num = int(params['start']), int(params['num'])
+            end = min(start - 1 + num, self.items)
+            return self._json({
+                'total': self.total or self.items, 'start': start, 'num': num,
+                'nextStart': end + 1 if end < self.items else -1,
+                'results': [stub_item(n) for n in range(start - 1, end)],
+            })
+        self.send_error(404)
+
+    def _json(self, body):
+        data = json.dumps(body).encode('utf-8')
+        # Like the real portal, errors come back with HTTP 200
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RestClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubPortal)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.portal_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubPortal.items = 250
+        StubPortal.total = None
+        StubPortal.requests = []
+        self.client = ArcGISRestClient(self.portal_url, TOKEN)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_pages_until_next_start_is_minus_one(self):
+        items = list(self.client.iter_items())
+        self.assertEqual(len(items), 250)
+        self.assertEqual(len({item['id'] for item in items}), 250)
+        searches = [params for path, params in StubPortal.requests if path.endswith('/search')]
+        self.assertEqual([params['start'] for params in searches], ['1', '101', '201'])
+        self.assertTrue(all(params['f'] == 'json' and params['num'] == '100' for params in searches))
+
+    def test_org_query_comes_from_portals_self(self):
+        self.assertEqual(self.client.org_id(), ORG_ID)
+        next(self.client.iter_items())
+        search = [params for path, params in StubPortal.requests if path.endswith('/search')][0]
+        self.assertEqual(search['q'], f"orgid:{ORG_ID}")
+
+    def test_empty_org(self):
+        StubPortal.items = 0
+        self.assertEqual(list(self.client.iter_rows()), [])
+
+    def test_error_body_raises(self):
+        with self.assertRaisesRegex(RuntimeError, 'ArcGIS REST error 400'):
+            list(self.client.iter_items(query='bogus'))
+        bad = ArcGISRestClient(self.portal_url, 'expired')
+        try:
+            with self.assertRaisesRegex(RuntimeError, '498'):
+                bad.org_id()
+        finally:
+            bad.close()
+
+    def test_warns_when_search_stops_short_of_total(self):
+        StubPortal.items = 150
+        StubPortal.total = 20000
+        with self.assertLogs('agol_rest', level='WARNING') as logs:
+            items = list(self.client.iter_items())
+        self.assertEqual(len(items), 150)
+        self.assertIn('only 150 of 20000', logs.output[0])
+
+    def test_token_is_valid(self):
+        self.assertTrue(token_is_valid(self.portal_url, TOKEN))
+        self.assertFalse(token_is_valid(self.portal_url, 'expired'))
+
+    def test_rows_match_preview_columns(self):
+        row = next(self.client.iter_rows())
+        self.assertEqual(row[:5], ['Item 0', '0' * 32, 'Web Map', 'owner0', 'Public'])
+        self.assertEqual(row[5], format_modified(stub_item(0)['modified']))
+
+
+class FormatModifiedTest(unittest.TestCase):
+
+    def test_uses_the_given_time_zone(self):
+        # 03:33 UTC on Jan 1 is still Dec 31 in US Central time
+        epoch_ms = int(datetime(2025, 1, 1, 3, 33, tzinfo=timezone.utc).timestamp() * 1000)
+        self.assertEqual(format_modified(epoch_ms, timezone.utc), 'Jan 1, 2025')
+        self.assertEqual(format_modified(epoch_ms, timezone(timedelta(hours=-6))), 'Dec 31, 2024')
+
+    def test_none(self):
+        self.assertIsNone(format_modified(None))
+        self.assertIsNone(item_to_row({})[5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+"""ItemEnricher against a local aiohttp stub of the portal's item endpoints."""
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from aiohttp import web
+
+from enrich import ENRICHED_COLUMNS, EnrichmentCache, ItemEnricher
+
+TOKEN = 'stub-token'
+LAYER_URL = 'https://services.example.invalid/arcgis/rest/services/Parcels/FeatureServer/0'
+
+
+class StubPortal:
+    """content/items/<id>, its /data and content/users/<owner>, counting requests and concurrency.
+
+    IDs starting with 'busy' get a 429 on their first request, 'broken' IDs an
+    error body, and 'map' IDs are web maps with one operational layer.
+    """
+
+    delay = 0.05
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.throttled = set()
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/sharing/rest/content/items/{id}', self.item)
+        app.router.add_get('/sharing/rest/content/items/{id}/data', self.data)
+        app.router.add_get('/sharing/rest/content/users/{owner}', self.user)
+        return app
+
+    async def _enter(self, request):
+        self.requests.append(request.path)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if request.query.get('token') != TOKEN:
+            return web.json_response({'error': {'code': 498, 'message': 'Invalid token'}})
+        return None
+
+    async def item(self, request):
+        denied = await self._enter(request)
+        if denied:
+            return denied
+        item_id = request.match_info['id']
+        if item_id.startswith('busy') and item_id not in self.throttled:
+            self.throttled.add(item_id)
+            return web.json_response({}, status=429)
+        if item_id.startswith('broken'):
+            return web.json_response({'error': {'code': 400, 'message': 'Item does not exist'}})
+        is_map = item_id.startswith('map')
+        return web.json_response({
+            'id': item_id, 'type': 'Web Map' if is_map else 'Feature Service',
+            'url': None if is_map else f"https://services.example.invalid/{item_id}/FeatureServer",
+            'owner': 'alice', 'ownerFolder': 'f1', 'size': 2048, 'numViews': 7,
+            'tags': ['parcels', 'county'], 'created': 1717243200000,
+        })
+
+    async def data(self, request):
+        denied = await self._enter(request)
+        if denied:
+            return denied
+        return web.json_response({
+            'operationalLayers': [{'url': LAYER_URL}, {'title': 'sketch layer'}], 'tables': [],
+        })
+
+    async def user(self, request):
+        denied = await self._enter(request)
+        if denied:
+            return denied
+        return web.json_response({'folders': [{'id': 'f1', 'title': 'Planning'}]})
+
+
+def row(item_id, last_updated='Jun 1, 2024'):
+    return ['Title', item_id, 'Feature Service', 'alice', 'Public', last_updated]
+
+
+class EnricherTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.loop = asyncio.new_event_loop()
+        threading.Thread(target=cls.loop.run_forever, daemon=True).start()
+
+        async def start():
+            cls.portal = StubPortal()
+            cls.runner = web.AppRunner(cls.portal.app())
+            await cls.runner.setup()
+            await web.TCPSite(cls.runner, '127.0.0.1', 0).start()
+            return cls.runner.addresses[0][1]
+        port = asyncio.run_coroutine_threadsafe(start(), cls.loop).result()
+        cls.portal_url = f"http://127.0.0.1:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls.runner.cleanup(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+
+    def setUp(self):
+        self.portal.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = EnrichmentCache(os.path.join(self.tmp.name, 'enrichment.db'))
+        # No real backoff delays between retries
+        patcher = mock.patch('enrich.random.uniform', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def enricher(self, **kwargs):
+        enricher = ItemEnricher(self.portal_url, TOKEN, cache=self.cache, **kwargs)
+        self.addCleanup(enricher.close)
+        return enricher
+
+    def item_requests(self):
+        return [path for path in self.portal.requests if '/content/items/' in path]
+
+    def test_appends_details(self):
+        enriched = self.enricher().enrich([row('svc1')])[0]
+        self.assertEqual(len(enriched), 6 + len(ENRICHED_COLUMNS))
+        size, views, tags, created, folder, services = enriched[6:]
+        self.assertEqual((size, views, tags, folder), (2048, 7, 'parcels, county', 'Planning'))
+        self.assertTrue(created.startswith('Jun'))
+        self.assertEqual(services, 'https://services.example.invalid/svc1/FeatureServer')
+
+    def test_concurrency_cap(self):
+        rows = [row(f"svc{n}") for n in range(20)]
+        enriched = self.enricher(concurrency=4).enrich(rows)
+        self.assertEqual(len(enriched), 20)
+        self.assertLessEqual(self.portal.max_active, 4)
+        self.assertGreater(self.portal.max_active, 1)
+
+    def test_folders_fetched_once_per_owner(self):
+        self.enricher().enrich([row(f"svc{n}") for n in range(5)])
+        users = [path for path in self.portal.requests if '/content/users/' in path]
+        self.assertEqual(users, ['/sharing/rest/content/users/alice'])
+
+    def test_retries_quota_errors(self):
+        enriched = self.enricher().enrich([row('busy1')])[0]
+        self.assertEqual(enriched[6], 2048)
+        self.assertEqual(self.item_requests().count('/sharing/rest/content/items/busy1'), 2)
+
+    def test_error_body_leaves_columns_empty_and_uncached(self):
+        enricher = self.enricher()
+        enriched = enricher.enrich([row('broken1'), row('svc1')])
+        self.assertEqual(enriched[0][6:], [None] * len(ENRICHED_COLUMNS))
+        self.assertEqual(enriched[1][6], 2048)
+        self.assertIsNone(self.cache.get('broken1', 'Jun 1, 2024'))
+        enricher.enrich([row('broken1')])
+        self.assertEqual(self.item_requests().count('/sharing/rest/content/items/broken1'), 2)
+
+    def test_invalid_token(self):
+        enricher = ItemEnricher(self.portal_url, 'expired', cache=self.cache)
+        self.addCleanup(enricher.close)
+        self.assertEqual(enricher.enrich([row('svc1')])[0][6:], [None] * len(ENRICHED_COLUMNS))
+
+    def test_cache_hit_until_last_updated_changes(self):
+        enricher = self.enricher()
+        first = enricher.enrich([row('svc1')])
+        self.assertEqual(enricher.enrich([row('svc1')]), first)
+        self.assertEqual(len(self.item_requests()), 1)
+        enricher.enrich([row('svc1', 'Jul 4, 2024')])
+        self.assertEqual(len(self.item_requests()), 2)
+
+    def test_map_services_from_layer_urls(self):
+        enriched = self.enricher().enrich([row('map1')])[0]
+        self.assertEqual(enriched[-1], LAYER_URL)
+        self.assertIn('/sharing/rest/content/items/map1/data', self.portal.requests)
+
+    def test_enrich_stream_batches(self):
+        rows = (row(f"svc{n}") for n in range(10))
+        enriched = list(self.enricher(concurrency=2).enrich_stream(rows, batch_size=3))
+        self.assertEqual([r[1] for r in enriched], [f"svc{n}" for n in range(10)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+"""Wait timeouts learned from how long each step has actually taken.
+
+AdaptiveTimeouts keeps a latency histogram per wait step, such as the
+Preview panel rendering or a page transition. Each step's timeout is a high
+percentile of that history with some headroom, clamped to a floor and a
+ceiling. A row that will never render then fails within seconds when the
+portal is fast, while a portal that has slowed down still gets time. The
+histograms decay, so old runs fade out, and are kept in the state store
+between runs.
+"""
+import json
+import bisect
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper edges in seconds of the histogram buckets, 50 ms up to about 5 minutes
+BUCKETS = tuple(0.05 * 1.25 ** i for i in range(40))
+
+# state_store meta key holding the histograms
+META_KEY = 'wait_latency_by_step'
+
+# Consecutive timeouts double a learned timeout at most this many times
+MAX_ESCALATIONS = 2
+
+
+class LatencyHistogram:
+    """Decaying histogram of latencies; each observation weighs the older ones down by ``decay``."""
+
+    def __init__(self, counts=None, decay: float = 0.998):
+        self.counts = list(counts) if counts else [0.0] * len(BUCKETS)
+        self.decay = decay
+
+    @property
+    def weight(self):
+        return sum(self.counts)
+
+    def observe(self, seconds: float):
+        self.counts = [count * self.decay for count in self.counts]
+        self.counts[min(bisect.bisect_left(BUCKETS, seconds), len(BUCKETS) - 1)] += 1
+
+    def percentile(self, q: float):
+        """Upper edge of the bucket holding quantile ``q`` (0-1), or None while empty."""
+        target = q * self.weight
+        if not target:
+            return None
+        seen = 0.0
+        for edge, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= target:
+                return edge
+        return BUCKETS[-1]
+
+
+class AdaptiveTimeouts:
+    """Timeout per wait step from the ``percentile`` of its latencies times ``headroom``.
+
+    ``defaults`` gives each step's fixed timeout, used until ``min_samples``
+    waits have been seen and for steps without ``bounds``, such as the Duo
+    prompt, which waits on a person. ``bounds`` maps a step to its
+    (floor, ceiling) in seconds. Each consecutive timeout of a step doubles
+    its learned timeout, at most MAX_ESCALATIONS times, until a wait succeeds
+    again. ``store`` is a StateStore to keep the histograms in; save()
+    writes them. Thread-safe.
+    """
+
+    def __init__(self, defaults, bounds, store=None, percentile: float = 0.99,
+                 headroom: float = 2.0, min_samples: int = 20):
+        self.defaults = defaults
+        self.bounds = bounds
+        self.store = store
+        self.percentile = percentile
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self._histograms = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.store:
+            return
+        try:
+            saved = json.loads(self.store.get_meta(META_KEY) or '{}')
+            for step, counts in saved.items():
+                if step in self.bounds and len(counts) == len(BUCKETS):
+                    self._histograms[step] = LatencyHistogram(counts)
+        except Exception as e:
+            logger.warning(f"Ignoring saved wait latencies: {e}")
+            return
+        if self._histograms:
+            logger.info("Wait timeouts: " + ", ".join(
+                f"{step} {self.timeout(step):.1f} s" for step in sorted(self._histograms)
+            ))
+
+    def save(self):
+        """Keep the histograms in the state store for the next run."""
+        if not self.store:
+            return
+        with self._lock:
+            saved = {step: histogram.counts for step, histogram in self._histograms.items()}
+        try:
+            self.store.set_meta(META_KEY, json.dumps(saved))
+        except Exception as e:
+            logger.error(f"Failed to save wait latencies: {e}")
+
+    def timeout(self, step: str):
+        """Seconds to wait for ``step`` before giving up."""
+        if step not in self.bounds:
+            return self.defaults[step]
+        floor, ceiling = self.bounds[step]
+        with self._lock:
+            histogram = self._histograms.get(step)
+            misses = self._misses.get(step, 0)
+            if histogram is None or histogram.weight < self.min_samples:
+                return self.defaults[step]
+            timeout = histogram.percentile(self.percentile) * self.headroom
+        return min(ceiling, max(floor, timeout * 2 ** misses))
+
+    def observe(self, step: str, seconds: float):
+        """Record a wait for ``step`` that succeeded after ``seconds``."""
+        if step not in self.bounds:
+            return
+        with self._lock:
+            self._histograms.setdefault(step, LatencyHistogram()).observe(seconds)
+            self._misses[step] = 0
+
+    def timed_out(self, step: str):
+        """Record a wait for ``step`` that gave up; the next wait gets longer."""
+        if step not in self.bounds:
+            return
+        with self._lock:
+            # Timeouts are not latencies: a row that never renders would inflate the history
+            self._misses[step] = min(self._misses.get(step, 0) + 1, MAX_ESCALATIONS)
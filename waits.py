@@ -0,0 +1,165 @@
+"""Custom WebDriverWait conditions for the ArcGIS item browser.
+
+Each condition is a callable taking the driver, in the same style as
+selenium's expected_conditions: it returns a falsy value while the page is
+not ready and the useful result once it is.
+"""
+from selenium.common.exceptions import JavascriptException, WebDriverException
+
+TABLE_ROWS_SCRIPT = """
+    // Count table rows whose shadow DOM has rendered its Preview button
+    const rows = document.querySelectorAll('arcgis-item-browser-table-row');
+    let rendered = 0;
+    for (const row of rows) {
+        if (!row.shadowRoot) continue;
+        for (const btn of row.shadowRoot.querySelectorAll('button')) {
+            if (btn.textContent.trim() === 'Preview') {
+                rendered++;
+                break;
+            }
+        }
+    }
+    return rendered;
+"""
+
+
+# Finds the first element matching a selector anywhere below root, descending into shadow roots
+DEEP_FIND_JS = """
+    function deepFind(root, selector) {
+        const found = root.querySelector(selector);
+        if (found) return found;
+        for (const el of root.querySelectorAll('*')) {
+            if (el.shadowRoot) {
+                const nested = deepFind(el.shadowRoot, selector);
+                if (nested) return nested;
+            }
+        }
+        return null;
+    }
+"""
+
+PAGE_STATE_SCRIPT = DEEP_FIND_JS + """
+    const rows = document.querySelectorAll('arcgis-item-browser-table-row');
+    let rendered = 0;
+    for (const row of rows) {
+        if (!row.shadowRoot) continue;
+        for (const btn of row.shadowRoot.querySelectorAll('button')) {
+            if (btn.textContent.trim() === 'Preview') {
+                rendered++;
+                break;
+            }
+        }
+    }
+    const first = rows.length && rows[0].shadowRoot ? rows[0].shadowRoot.textContent.trim() : null;
+
+    // Without a pagination control everything is on a single page
+    const pagination = deepFind(document, 'calcite-pagination');
+    return {
+        total: pagination ? pagination.totalItems : rows.length,
+        pageSize: pagination ? pagination.pageSize : rows.length,
+        startItem: pagination ? pagination.startItem : 1,
+        rows: rows.length,
+        rendered: rendered,
+        firstRow: first
+    };
+"""
+
+
+class table_rows_rendered:
+    """Wait until at least ``min_rows`` Org table rows have rendered.
+
+    Returns the number of rendered rows.
+    """
+
+    def __init__(self, min_rows: int = 1):
+        self.min_rows = min_rows
+
+    def __call__(self, driver):
+        try:
+            count = driver.execute_script(TABLE_ROWS_SCRIPT)
+        except JavascriptException:
+            return False
+        return count if count and count >= self.min_rows else False
+
+
+class preview_item_changed:
+    """Wait until the Preview panel shows an item other than ``previous_id``.
+
+    With ``expected_id`` it waits for that item instead, which may be the
+    one already showing. ``read`` takes the driver and returns a dict of
+    field values including ``ID``, e.g. page_helper.read_preview. The
+    condition also waits for every name in ``fields`` to be non-empty and
+    returns the dict once the panel has fully rendered.
+    """
+
+    def __init__(self, read, previous_id=None, fields=(), expected_id=None):
+        self.read = read
+        self.previous_id = previous_id
+        self.fields = fields
+        self.expected_id = expected_id
+
+    def __call__(self, driver):
+        try:
+            values = self.read(driver)
+        except JavascriptException:
+            return False
+        if not values or not values.get('ID'):
+            return False
+        if self.expected_id:
+            if values['ID'] != self.expected_id:
+                return False
+        elif values['ID'] == self.previous_id:
+            return False
+        if any(not values.get(field) for field in self.fields):
+            return False
+        return values
+
+
+class page_loaded:
+    """Wait until a page of the Org table has fully rendered.
+
+    With ``previous`` (an earlier result of this condition) it also waits for
+    the pagination and the first row to move away from that page. Returns the
+    page state: total, pageSize, startItem, rows, rendered and firstRow.
+    """
+
+    def __init__(self, previous=None):
+        self.previous = previous
+
+    def __call__(self, driver):
+        try:
+            state = driver.execute_script(PAGE_STATE_SCRIPT)
+        except JavascriptException:
+            return False
+        if not state or not state['pageSize']:
+            return False
+        if self.previous and (state['startItem'] == self.previous['startItem']
+                              or state['firstRow'] == self.previous['firstRow']):
+            return False
+        expected = min(state['pageSize'], state['total'] - state['startItem'] + 1)
+        if not state['rendered'] or state['rendered'] < expected:
+            return False
+        return state
+
+
+class first_match:
+    """Wait until any of several conditions is met, checking them in order on every poll.
+
+    ``conditions`` is a sequence of (name, condition) pairs, each condition a
+    callable taking the driver, such as an expected_conditions instance.
+    Unlike expected_conditions.any_of, returns which one matched:
+    (name, result) for the first condition met.
+    """
+
+    def __init__(self, conditions):
+        self.conditions = list(conditions)
+
+    def __call__(self, driver):
+        for name, condition in self.conditions:
+            try:
+                result = condition(driver)
+            except WebDriverException:
+                continue
+            if result:
+                return name, result
+        return False
@@ -0,0 +1,128 @@
+import queue
+import logging
+import threading
+
+from waits import page_loaded
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """Scrape Org content pages in parallel with several headless browsers.
+
+    The main scraper logs in once; each worker clones its cookies into a
+    browser of its own and pulls pages from a shared queue, so every page is
+    scraped by exactly one worker. A page whose worker fails is requeued for
+    another attempt and the failed worker restarts its browser, so one bad
+    worker cannot stop the job. A page that still fails, or that is left
+    when every worker has stopped, ends the job after the pages before it.
+    """
+
+    def __init__(self, scraper, workers: int = 4, headless: bool = True, max_attempts: int = 2):
+        self.scraper = scraper
+        self.workers = workers
+        self.max_attempts = max_attempts
+        # Chrome locks its user-data dir, so workers cannot share the scraper's
+        self.profile = scraper.profile.replace(headless=headless, user_data_dir=None)
+
+    def run(self, pages):
+        """Scrape ``pages`` and yield (page, rows) in page order.
+
+        Raises RuntimeError once the pages before the first one that could
+        not be scraped have been yielded, so a checkpoint stops short of it.
+        """
+        pages = list(pages)
+        cookies = self.scraper.driver.get_cookies()
+        tasks = queue.Queue()
+        for page in pages:
+            tasks.put((page, 1))
+        results = queue.Queue()
+
+        threads = [
+            threading.Thread(
+                target=self._work, args=(n, cookies, tasks, results),
+                name=f"scraper-worker-{n}", daemon=True,
+            )
+            for n in range(min(self.workers, len(pages)))
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Pages can finish out of order; hold them back until their turn
+        finished = {}
+        given_up = set()
+        next_index = 0
+        try:
+            while next_index < len(pages) and pages[next_index] not in given_up:
+                try:
+                    page, rows = results.get(timeout=1)
+                except queue.Empty:
+                    if not any(t.is_alive() for t in threads) and results.empty():
+                        logger.error("All workers stopped")
+                        break
+                    continue
+                if rows is None:
+                    given_up.add(page)
+                    continue
+                finished[page] = rows
+                while next_index < len(pages) and pages[next_index] in finished:
+                    yield pages[next_index], finished.pop(pages[next_index])
+                    next_index += 1
+        finally:
+            # If the consumer stopped early, let workers exit after their current page
+            while True:
+                try:
+                    tasks.get_nowait()
+                except queue.Empty:
+                    break
+
+        for thread in threads:
+            thread.join()
+        if next_index < len(pages):
+            raise RuntimeError(f"Pages not scraped: {pages[next_index:]}")
+
+    def _start_browser(self, worker, cookies):
+        worker._setup_webdriver(self.profile)
+        worker._open_with_cookies(cookies)
+        return worker._wait(page_loaded(), 'navigation')
+
+    def _stop_browser(self, worker):
+        if worker.driver:
+            try:
+                worker.driver.quit()
+            except Exception:
+                pass
+            worker.driver = None
+
+    def _work(self, n, cookies, tasks, results):
+        worker = self.scraper._clone()
+        # Also used if the worker has to restart its browser to free memory
+        worker.profile = self.profile
+        try:
+            state = self._start_browser(worker, cookies)
+            while True:
+                try:
+                    page, attempt = tasks.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    state = worker._go_to_page(page, state)
+                    logger.info(f"Worker {n} scraping page {page} ({state['rendered']} rows)")
+                    rows = list(worker._iter_page_rows(state['rendered'], page))
+                except Exception as e:
+                    logger.error(f"Worker {n} failed on page {page}: {e}")
+                    if attempt < self.max_attempts:
+                        worker.metrics.retry('worker_page')
+                        tasks.put((page, attempt + 1))
+                    else:
+                        logger.error(f"Giving up on page {page} after {attempt} attempts")
+                        results.put((page, None))
+                    self._stop_browser(worker)
+                    state = self._start_browser(worker, cookies)
+                    continue
+                results.put((page, rows))
+                state = worker._check_heap(page, state)
+        except Exception as e:
+            logger.error(f"Worker {n} stopped: {e}")
+        finally:
+            self._stop_browser(worker)